@@ -4,9 +4,20 @@ Automated demo of Twitter Competitor Analyzer (no user input required)
 """
 
 import asyncio
-import json
+import sys
 from datetime import datetime
 from twitter_analyzer import TwitterCompetitorAnalyzer
+from scrape_cache import TweetFetchScheduler
+from result_writer import result_records, write_jsonl_gz
+from event_loop import install_uvloop
+from text_format import preview
+
+# Row templates for the report tables, parsed once at import
+HASHTAG_ROW = "  {i:2d}. #{hashtag:<15} ({frequency:2d} uses)".format
+HOOK_STARTER_ROW = "  {i}. \"{starter}...\" (avg: {avg_engagement:.1f}, used {count}x)".format
+LENGTH_ROW = "  • {length_range:<15}: {avg_engagement:6.1f} avg engagement ({count:2d} tweets)".format
+DAY_ROW = "  • {day:<9}: {score:.1f} avg engagement".format
+HOUR_ROW = "  • {hour:02d}:00 : {score:.1f} avg engagement".format
 
 class DemoTwitterAnalyzer(TwitterCompetitorAnalyzer):
     """Demo version that doesn't require API keys"""
@@ -19,7 +30,7 @@ class DemoTwitterAnalyzer(TwitterCompetitorAnalyzer):
         """Use fallback content generation (no API required)"""
         return self._generate_fallback_ideas(patterns_analysis)
 
-async def run_automated_demo():
+async def run_automated_demo(use_cache=True):
     """Run a fully automated demo"""
     
     print("🐦 Twitter Competitor Analyzer - AUTOMATED DEMO")
@@ -32,7 +43,8 @@ async def run_automated_demo():
         'user_username': '100xengineers',
         'competitor_usernames': ['naval', 'sama', 'paulg'],
         'tweets_per_competitor': 8,
-        'auto_discover': True
+        'auto_discover': True,
+        'use_cache': use_cache
     }
     
     print("📋 Demo Configuration:")
@@ -48,29 +60,44 @@ async def run_automated_demo():
         print("🔍 Starting Analysis...")
         print("=" * 30)
         
-        # Build competitor list
-        final_competitors = list(config['competitor_usernames'])
+        # Start fetching each competitor as soon as it's known, concurrently and paced per host,
+        # deduplicated and capped for the demo
+        scheduler = TweetFetchScheduler(
+            analyzer.get_top_performing_tweets, config['tweets_per_competitor'], 8,
+            enabled=config.get('use_cache', True)
+        )
+        
+        for username in config['competitor_usernames']:
+            scheduler.schedule(username)
         
         # Auto-discover competitors
         if config['auto_discover'] and config['user_username']:
             print(f"🔍 Auto-discovering competitors for @{config['user_username']}...")
-            discovered = await analyzer.discover_competitors(config['user_username'], 4)
-            final_competitors.extend(discovered)
-            final_competitors = list(set(final_competitors))[:8]  # Limit for demo
-            print(f"✅ Discovered {len(discovered)} additional competitors")
+            discovered = 0
+            async for username in analyzer.iter_competitors(config['user_username'], 4):
+                scheduler.schedule(username)
+                discovered += 1
+            print(f"✅ Discovered {discovered} additional competitors")
+        
+        final_competitors = list(scheduler.tasks)
         
         print(f"\n📊 Final competitor list ({len(final_competitors)} accounts):")
         for i, competitor in enumerate(final_competitors, 1):
             print(f"  {i}. @{competitor}")
         print()
         
-        # Analyze each competitor's tweets
+        fetched = await asyncio.gather(*scheduler.tasks.values(), return_exceptions=True)
+        
         competitor_tweets_data = {}
+        competitor_stats = {}
         
-        for i, username in enumerate(final_competitors):
+        for i, (username, tweets) in enumerate(zip(final_competitors, fetched)):
             print(f"📱 [{i+1}/{len(final_competitors)}] Analyzing @{username}...")
             
-            tweets = await analyzer.get_top_performing_tweets(username, config['tweets_per_competitor'])
+            if isinstance(tweets, Exception):
+                print(f"  ❌ Error: {str(tweets)}")
+                print()
+                continue
             
             if tweets:
                 competitor_tweets_data[username] = tweets
@@ -79,7 +106,12 @@ async def run_automated_demo():
                 
                 # Show top tweet preview
                 top_tweet = tweets[0]
-                text_preview = top_tweet.get('text', '')[:70] + "..." if len(top_tweet.get('text', '')) > 70 else top_tweet.get('text', '')
+                competitor_stats[username] = {
+                    "tweets_count": len(tweets),
+                    "avg_engagement": avg_engagement,
+                    "top_tweet": top_tweet
+                }
+                text_preview = preview(top_tweet.get('text', ''), 70)
                 print(f"  🔥 Top tweet: \"{text_preview}\"")
                 print(f"      Engagement: {top_tweet.get('engagement_score', 0):.1f} ({top_tweet.get('likes', 0)} likes, {top_tweet.get('retweets', 0)} RTs)")
             else:
@@ -91,7 +123,7 @@ async def run_automated_demo():
             print("❌ No competitor data available")
             return False
         
-        total_tweets = sum(len(tweets) for tweets in competitor_tweets_data.values())
+        total_tweets = sum(stats['tweets_count'] for stats in competitor_stats.values())
         print(f"📈 Analysis Summary:")
         print(f"  • Competitors analyzed: {len(competitor_tweets_data)}")
         print(f"  • Total tweets analyzed: {total_tweets}")
@@ -101,111 +133,117 @@ async def run_automated_demo():
         print("🔍 Analyzing patterns across all tweets...")
         patterns_analysis = await analyzer.analyze_tweet_patterns(competitor_tweets_data)
         
-        # Display detailed pattern insights
-        print("\n📊 PATTERN ANALYSIS RESULTS")
-        print("=" * 40)
+        # Display detailed pattern insights (buffered, written once per section)
+        out = []
+        out.append("\n📊 PATTERN ANALYSIS RESULTS")
+        out.append("=" * 40)
         
-        print(f"📈 Overall engagement: {patterns_analysis.get('avg_engagement_score', 0):.1f} average score")
-        print()
+        out.append(f"📈 Overall engagement: {patterns_analysis.get('avg_engagement_score', 0):.1f} average score")
+        out.append("")
         
         # Top hashtags
         top_hashtags = patterns_analysis.get('top_hashtags', [])[:8]
         if top_hashtags:
-            print("🏷️  Most Popular Hashtags:")
+            out.append("🏷️  Most Popular Hashtags:")
             for i, hashtag_data in enumerate(top_hashtags, 1):
-                print(f"  {i:2d}. #{hashtag_data['hashtag']:<15} ({hashtag_data['frequency']:2d} uses)")
-            print()
+                out.append(HASHTAG_ROW(i=i, **hashtag_data))
+            out.append("")
         
         # Hook patterns
         hook_patterns = patterns_analysis.get('hook_patterns', {})
         top_hooks = hook_patterns.get('top_performing_hooks', [])[:5]
         if top_hooks:
-            print("🎣 Top Performing Hook Examples:")
+            out.append("🎣 Top Performing Hook Examples:")
             for i, hook_data in enumerate(top_hooks, 1):
                 hook_text = hook_data['hook'][:60] + "..." if len(hook_data['hook']) > 60 else hook_data['hook']
-                print(f"  {i}. \"{hook_text}\"")
-                print(f"     Engagement: {hook_data['engagement_score']:.1f} (@{hook_data['competitor']})")
-            print()
+                out.append(f"  {i}. \"{hook_text}\"")
+                out.append(f"     Engagement: {hook_data['engagement_score']:.1f} (@{hook_data['competitor']})")
+            out.append("")
         
         # Common hook starters
         hook_starters = hook_patterns.get('common_hook_starters', [])[:5]
         if hook_starters:
-            print("🚀 Most Effective Hook Starters:")
+            out.append("🚀 Most Effective Hook Starters:")
             for i, starter_data in enumerate(hook_starters, 1):
-                print(f"  {i}. \"{starter_data['starter']}...\" (avg: {starter_data['avg_engagement']:.1f}, used {starter_data['count']}x)")
-            print()
+                out.append(HOOK_STARTER_ROW(i=i, **starter_data))
+            out.append("")
         
         # Topic themes
         topics = patterns_analysis.get('topic_themes', [])[:8]
         if topics:
-            print("📝 Common Topic Themes:")
+            out.append("📝 Common Topic Themes:")
             topic_chunks = [topics[i:i+4] for i in range(0, len(topics), 4)]
             for chunk in topic_chunks:
-                print(f"  • {' • '.join(chunk)}")
-            print()
+                out.append(f"  • {' • '.join(chunk)}")
+            out.append("")
         
         # Length patterns
         length_patterns = patterns_analysis.get('optimal_length', {})
         if length_patterns:
-            print("📏 Tweet Length Performance:")
+            out.append("📏 Tweet Length Performance:")
             sorted_lengths = sorted(length_patterns.items(), key=lambda x: x[1].get('avg_engagement', 0), reverse=True)
             for length_range, data in sorted_lengths:
-                avg_eng = data.get('avg_engagement', 0)
-                count = data.get('count', 0)
-                print(f"  • {length_range:<15}: {avg_eng:6.1f} avg engagement ({count:2d} tweets)")
-            print()
+                out.append(LENGTH_ROW(
+                    length_range=length_range,
+                    avg_engagement=data.get('avg_engagement', 0),
+                    count=data.get('count', 0)
+                ))
+            out.append("")
         
         # Posting patterns
         posting_patterns = patterns_analysis.get('posting_patterns', {})
         best_days = posting_patterns.get('best_days', [])[:5]
         if best_days:
-            print("📅 Best Days to Post:")
+            out.append("📅 Best Days to Post:")
             for day, score in best_days:
-                print(f"  • {day:<9}: {score:.1f} avg engagement")
-            print()
+                out.append(DAY_ROW(day=day, score=score))
+            out.append("")
         
         best_hours = posting_patterns.get('best_hours', [])[:5]
         if best_hours:
-            print("🕐 Best Hours to Post:")
+            out.append("🕐 Best Hours to Post:")
             for hour, score in best_hours:
-                time_str = f"{hour:02d}:00"
-                print(f"  • {time_str:<6}: {score:.1f} avg engagement")
-            print()
+                out.append(HOUR_ROW(hour=hour, score=score))
+            out.append("")
         
         # Generate content ideas
-        print("💡 Generating Content Ideas...")
-        print("=" * 35)
+        out.append("💡 Generating Content Ideas...")
+        out.append("=" * 35)
+        sys.stdout.write("\n".join(out) + "\n")
+        out.clear()
         content_ideas = await analyzer.generate_content_ideas(patterns_analysis, competitor_tweets_data)
         
         # Display content ideas
         tweet_ideas = content_ideas.get('tweet_ideas', [])
         if tweet_ideas:
-            print(f"\n🐦 TWEET IDEAS ({len(tweet_ideas)} suggestions):")
-            print("-" * 45)
+            out.append(f"\n🐦 TWEET IDEAS ({len(tweet_ideas)} suggestions):")
+            out.append("-" * 45)
             for i, tweet in enumerate(tweet_ideas, 1):
-                print(f"{i:2d}. {tweet}")
-            print()
+                out.append(f"{i:2d}. {tweet}")
+            out.append("")
         
         hook_ideas = content_ideas.get('hook_ideas', [])
         if hook_ideas:
-            print(f"🎣 HOOK FORMULAS ({len(hook_ideas)} patterns):")
-            print("-" * 40)
+            out.append(f"🎣 HOOK FORMULAS ({len(hook_ideas)} patterns):")
+            out.append("-" * 40)
             # Display in columns
             hook_chunks = [hook_ideas[i:i+2] for i in range(0, len(hook_ideas), 2)]
             for chunk in hook_chunks:
                 if len(chunk) == 2:
-                    print(f"  • {chunk[0]:<25} • {chunk[1]}")
+                    out.append(f"  • {chunk[0]:<25} • {chunk[1]}")
                 else:
-                    print(f"  • {chunk[0]}")
-            print()
+                    out.append(f"  • {chunk[0]}")
+            out.append("")
         
         strategy_insights = content_ideas.get('strategy_insights', [])
         if strategy_insights:
-            print(f"📈 STRATEGY INSIGHTS ({len(strategy_insights)} recommendations):")
-            print("-" * 50)
+            out.append(f"📈 STRATEGY INSIGHTS ({len(strategy_insights)} recommendations):")
+            out.append("-" * 50)
             for i, insight in enumerate(strategy_insights, 1):
-                print(f"{i}. {insight}")
-            print()
+                out.append(f"{i}. {insight}")
+            out.append("")
+        sys.stdout.write("\n".join(out) + "\n")
+        out.clear()
         
         # Save results
         results = {
@@ -219,34 +257,27 @@ async def run_automated_demo():
             },
             "patterns_analysis": patterns_analysis,
             "content_ideas": content_ideas,
-            "competitor_data": {
-                username: {
-                    "tweets_count": len(tweets),
-                    "avg_engagement": sum(t['engagement_score'] for t in tweets) / len(tweets),
-                    "top_tweet": tweets[0] if tweets else None
-                }
-                for username, tweets in competitor_tweets_data.items()
-            }
+            "competitor_data": competitor_stats
         }
         
-        filename = f"twitter_demo_results.json"
-        with open(filename, 'w') as f:
-            json.dump(results, f, indent=2)
+        filename = "twitter_demo_results.jsonl.gz"
+        write_jsonl_gz(filename, result_records(results))
         
-        print("💾 RESULTS SAVED")
-        print("-" * 20)
-        print(f"📄 Detailed results: {filename}")
-        print(f"📊 {total_tweets} tweets analyzed from {len(competitor_tweets_data)} competitors")
-        print(f"💡 {len(tweet_ideas)} tweet ideas and {len(hook_ideas)} hook formulas generated")
+        out.append("💾 RESULTS SAVED")
+        out.append("-" * 20)
+        out.append(f"📄 Detailed results: {filename}")
+        out.append(f"📊 {total_tweets} tweets analyzed from {len(competitor_tweets_data)} competitors")
+        out.append(f"💡 {len(tweet_ideas)} tweet ideas and {len(hook_ideas)} hook formulas generated")
         
-        print("\n✅ DEMO COMPLETED SUCCESSFULLY!")
-        print("=" * 50)
-        print("🚀 This demo shows how the Twitter agent:")
-        print("   • Discovers competitor accounts automatically")
-        print("   • Analyzes tweet patterns and engagement")
-        print("   • Extracts successful content formulas")
-        print("   • Generates actionable content ideas")
-        print("\n💡 For real Twitter data, set up API keys and use cli_test.py")
+        out.append("\n✅ DEMO COMPLETED SUCCESSFULLY!")
+        out.append("=" * 50)
+        out.append("🚀 This demo shows how the Twitter agent:")
+        out.append("   • Discovers competitor accounts automatically")
+        out.append("   • Analyzes tweet patterns and engagement")
+        out.append("   • Extracts successful content formulas")
+        out.append("   • Generates actionable content ideas")
+        out.append("\n💡 For real Twitter data, set up API keys and use cli_test.py")
+        sys.stdout.write("\n".join(out) + "\n")
         
         return True
         
@@ -258,7 +289,9 @@ async def run_automated_demo():
 
 def main():
     """Run the automated demo"""
-    success = asyncio.run(run_automated_demo())
+    install_uvloop()
+    
+    success = asyncio.run(run_automated_demo(use_cache='--no-cache' not in sys.argv))
     return success
 
 if __name__ == "__main__":
@@ -3,12 +3,12 @@
 CLI interface to test the Twitter Competitor Analyzer
 """
 
+import argparse
 import asyncio
-import json
 import os
 import sys
 from datetime import datetime
-from twitter_analyzer import TwitterCompetitorAnalyzer
+from event_loop import install_uvloop
 
 def print_header():
     print("🐦 Twitter Competitor Analyzer - CLI Test")
@@ -59,7 +59,7 @@ def get_user_input():
     
     # Get number of tweets per competitor
     tweets_per_competitor = input("\nTweets per competitor (default: 10): ").strip()
-    tweets_per_competitor = int(tweets_per_competitor) if tweets_per_competitor.isdigit() else 10
+    tweets_per_competitor = int(tweets_per_competitor) if tweets_per_competitor.isdigit() and int(tweets_per_competitor) > 0 else 10
     
     # Auto-discover competitors
     auto_discover = True
@@ -75,31 +75,91 @@ def get_user_input():
         'min_competitors': 5
     }
 
+def positive_int(value):
+    """argparse type for counts that must be at least 1"""
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value!r}")
+    return number
+
+def parse_args():
+    """Parse command-line options; args.interactive is set when no analysis option was given"""
+    parser = argparse.ArgumentParser(description="Twitter Competitor Analyzer - CLI Test")
+    analysis = parser.add_argument_group("analysis options", "setting any of these skips the interactive prompts")
+    analysis_actions = [
+        analysis.add_argument('--user', help="Your Twitter username (for competitor discovery)"),
+        analysis.add_argument('--competitors', help="Comma-separated competitor usernames"),
+        analysis.add_argument('--tweets-per-competitor', type=positive_int, default=10,
+                              help="Tweets per competitor (default: 10)"),
+        analysis.add_argument('--auto-discover', action=argparse.BooleanOptionalAction, default=None,
+                              help="Auto-discover additional competitors (default: on)")
+    ]
+    parser.add_argument('--no-cache', action='store_true', help="Skip the on-disk tweet cache")
+    
+    args = parser.parse_args()
+    args.interactive = all(getattr(args, action.dest) == action.default for action in analysis_actions)
+    return args
+
+def config_from_args(args):
+    """Build the analysis config from command-line options instead of prompting"""
+    competitor_usernames = []
+    if args.competitors:
+        competitor_usernames = [u.strip().replace('@', '') for u in args.competitors.split(',') if u.strip()]
+    
+    return {
+        'user_username': (args.user or '').strip().replace('@', ''),
+        'competitor_usernames': competitor_usernames,
+        'tweets_per_competitor': args.tweets_per_competitor,
+        'auto_discover': args.auto_discover if args.auto_discover is not None else True,
+        'min_competitors': 5
+    }
+
 async def run_analysis(config):
     """Run the Twitter competitor analysis"""
+    # Imported here so the environment check and input prompts don't pay for
+    # loading apify/aiohttp when the run never gets this far
+    from twitter_analyzer import TwitterCompetitorAnalyzer
+    from scrape_cache import TweetFetchScheduler
+    from result_writer import result_records, write_jsonl_gz
+    
+    analyzer = None
+    
     try:
         analyzer = TwitterCompetitorAnalyzer()
         
         print("\n🔍 Starting Analysis...")
         print("=" * 30)
         
-        # Build final competitor list
-        final_competitors = list(config['competitor_usernames'])
+        # Start fetching each competitor as soon as it's known, concurrently and paced per host,
+        # deduplicated and capped at 15
+        scheduler = TweetFetchScheduler(
+            analyzer.get_top_performing_tweets, config['tweets_per_competitor'], 15,
+            enabled=config.get('use_cache', True)
+        )
+        
+        for username in config['competitor_usernames']:
+            scheduler.schedule(username)
         
         # Auto-discover competitors if needed
-        if config['auto_discover'] and config['user_username'] and len(final_competitors) < config['min_competitors']:
+        if config['auto_discover'] and config['user_username'] and len(config['competitor_usernames']) < config['min_competitors']:
             print(f"🔍 Auto-discovering competitors for @{config['user_username']}...")
-            discovered = await analyzer.discover_competitors(
+            discovered = 0
+            async for username in analyzer.iter_competitors(
                 config['user_username'], 
-                config['min_competitors'] - len(final_competitors)
-            )
-            final_competitors.extend(discovered)
-            print(f"✅ Discovered {len(discovered)} competitors")
+                config['min_competitors'] - len(config['competitor_usernames'])
+            ):
+                scheduler.schedule(username)
+                discovered += 1
+            print(f"✅ Discovered {discovered} competitors")
         
-        # Remove duplicates and limit
-        final_competitors = list(set(final_competitors))[:15]
+        final_competitors = list(scheduler.tasks)
         
         if len(final_competitors) < 3:
+            for task in scheduler.tasks.values():
+                task.cancel()
             print("❌ Need at least 3 competitors to analyze.")
             print("💡 Tip: Provide more competitor usernames or ensure your username is valid for auto-discovery.")
             return False
@@ -109,33 +169,28 @@ async def run_analysis(config):
             print(f"  {i}. @{competitor}")
         print()
         
-        # Analyze each competitor's tweets
+        print(f"📡 Fetching tweets for {len(final_competitors)} competitors...")
+        fetched = await asyncio.gather(*scheduler.tasks.values(), return_exceptions=True)
+        
         competitor_tweets_data = {}
         
-        for i, username in enumerate(final_competitors):
-            print(f"📱 [{i+1}/{len(final_competitors)}] Analyzing @{username}...")
+        for i, (username, tweets) in enumerate(zip(final_competitors, fetched)):
+            print(f"📱 [{i+1}/{len(final_competitors)}] @{username}")
             
-            try:
-                tweets = await analyzer.get_top_performing_tweets(username, config['tweets_per_competitor'])
-                
-                if tweets:
-                    competitor_tweets_data[username] = tweets
-                    avg_engagement = sum(t['engagement_score'] for t in tweets) / len(tweets)
-                    print(f"  ✅ Found {len(tweets)} tweets (avg engagement: {avg_engagement:.1f})")
-                    
-                    # Show top tweet preview
-                    top_tweet = tweets[0]
-                    print(f"  🔥 Top tweet: \"{top_tweet.get('text', '')[:60]}...\"")
-                else:
-                    print(f"  ⚠️  No tweets found")
-                    
-            except Exception as e:
-                print(f"  ❌ Error: {str(e)}")
+            if isinstance(tweets, Exception):
+                print(f"  ❌ Error: {str(tweets)}")
                 continue
             
-            # Small delay between requests
-            if i < len(final_competitors) - 1:
-                await asyncio.sleep(1)
+            if tweets:
+                competitor_tweets_data[username] = tweets
+                avg_engagement = sum(t['engagement_score'] for t in tweets) / len(tweets)
+                print(f"  ✅ Found {len(tweets)} tweets (avg engagement: {avg_engagement:.1f})")
+                
+                # Show top tweet preview
+                top_tweet = tweets[0]
+                print(f"  🔥 Top tweet: \"{top_tweet.get('text', '')[:60]}...\"")
+            else:
+                print(f"  ⚠️  No tweets found")
         
         if not competitor_tweets_data:
             print("❌ No competitor data available")
@@ -176,9 +231,8 @@ async def run_analysis(config):
             "content_ideas": content_ideas
         }
         
-        filename = f"twitter_analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-        with open(filename, 'w') as f:
-            json.dump(results, f, indent=2)
+        filename = f"twitter_analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl.gz"
+        write_jsonl_gz(filename, result_records(results))
         
         print(f"\n💾 Results saved to {filename}")
         print("✅ Analysis completed successfully!")
@@ -190,43 +244,51 @@ async def run_analysis(config):
         import traceback
         traceback.print_exc()
         return False
+    
+    finally:
+        # Release the analyzer's keep-alive HTTP session
+        if analyzer is not None:
+            await analyzer.close()
 
 def print_pattern_insights(patterns_analysis):
     """Print pattern analysis insights"""
-    print("\n📊 Pattern Analysis Results:")
-    print("-" * 30)
+    out = []
+    out.append("\n📊 Pattern Analysis Results:")
+    out.append("-" * 30)
     
-    print(f"📈 Average engagement score: {patterns_analysis.get('avg_engagement_score', 0):.1f}")
+    out.append(f"📈 Average engagement score: {patterns_analysis.get('avg_engagement_score', 0):.1f}")
     
     # Top hashtags
     top_hashtags = patterns_analysis.get('top_hashtags', [])[:5]
     if top_hashtags:
-        print(f"\n🏷️  Top Hashtags:")
+        out.append(f"\n🏷️  Top Hashtags:")
         for i, hashtag_data in enumerate(top_hashtags, 1):
-            print(f"  {i}. #{hashtag_data['hashtag']} ({hashtag_data['frequency']} uses)")
+            out.append(f"  {i}. #{hashtag_data['hashtag']} ({hashtag_data['frequency']} uses)")
     
     # Hook patterns
     hook_patterns = patterns_analysis.get('hook_patterns', {})
     top_hooks = hook_patterns.get('top_performing_hooks', [])[:3]
     if top_hooks:
-        print(f"\n🎣 Top Performing Hooks:")
+        out.append(f"\n🎣 Top Performing Hooks:")
         for i, hook_data in enumerate(top_hooks, 1):
-            print(f"  {i}. \"{hook_data['hook'][:50]}...\" ({hook_data['engagement_score']:.1f})")
+            out.append(f"  {i}. \"{hook_data['hook'][:50]}...\" ({hook_data['engagement_score']:.1f})")
     
     # Topic themes
     topics = patterns_analysis.get('topic_themes', [])[:5]
     if topics:
-        print(f"\n📝 Top Topic Themes:")
+        out.append(f"\n📝 Top Topic Themes:")
         for i, topic in enumerate(topics, 1):
-            print(f"  {i}. {topic}")
+            out.append(f"  {i}. {topic}")
     
     # Posting patterns
     posting_patterns = patterns_analysis.get('posting_patterns', {})
     best_days = posting_patterns.get('best_days', [])[:3]
     if best_days:
-        print(f"\n📅 Best Posting Days:")
+        out.append(f"\n📅 Best Posting Days:")
         for day, score in best_days:
-            print(f"  • {day}: {score:.1f} avg engagement")
+            out.append(f"  • {day}: {score:.1f} avg engagement")
+    
+    sys.stdout.write("\n".join(out) + "\n")
 
 def print_content_ideas(content_ideas):
     """Print generated content ideas"""
@@ -260,6 +322,11 @@ def print_content_ideas(content_ideas):
 
 def main():
     """Main CLI function"""
+    args = parse_args()
+    interactive = args.interactive
+    
+    install_uvloop()
+    
     print_header()
     
     # Check environment
@@ -271,8 +338,9 @@ def main():
     print("\n✅ Environment OK")
     print()
     
-    # Get user input
-    config = get_user_input()
+    # Get user input, unless the run was fully configured on the command line
+    config = get_user_input() if interactive else config_from_args(args)
+    config['use_cache'] = not args.no_cache
     
     # Confirm configuration
     print(f"\n📋 Configuration Summary:")
@@ -281,17 +349,18 @@ def main():
     print(f"  • Auto-discover: {config['auto_discover']}")
     print(f"  • Tweets per competitor: {config['tweets_per_competitor']}")
     
-    proceed = input("\nProceed with analysis? (y/n): ").strip().lower()
-    if proceed != 'y':
-        print("❌ Analysis cancelled")
-        sys.exit(0)
+    if interactive:
+        proceed = input("\nProceed with analysis? (y/n): ").strip().lower()
+        if proceed != 'y':
+            print("❌ Analysis cancelled")
+            sys.exit(0)
     
     # Run analysis
     success = asyncio.run(run_analysis(config))
     
     if success:
         print("\n🎉 Twitter analysis completed successfully!")
-        print("📊 Check the generated JSON file for detailed results.")
+        print("📊 Check the generated .jsonl.gz file for detailed results.")
     else:
         print("\n💥 Analysis failed. Please check the errors above.")
         sys.exit(1)
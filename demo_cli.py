@@ -4,10 +4,40 @@ Demo CLI interface for Twitter Competitor Analyzer (works without API keys)
 """
 
 import asyncio
-import json
+import heapq
+import re
 import sys
 from datetime import datetime
+from operator import itemgetter
+from statistics import fmean
 from twitter_analyzer import TwitterCompetitorAnalyzer
+from result_writer import result_records, write_jsonl_gz
+from scrape_cache import unique_handles
+
+# Twitter handles are letters, digits and underscores; anything else separates them
+HANDLE_RE = re.compile(r'[A-Za-z0-9_]+')
+
+# Preset demo profiles, keyed by menu choice
+DEMO_PROFILES = {
+    '1': {
+        'name': '100x Engineer',
+        'user_username': '100xengineers',
+        'competitor_usernames': ('naval', 'sama', 'paulg', 'kentcdodds'),
+        'description': 'Tech/Engineering focused analysis'
+    },
+    '2': {
+        'name': 'Entrepreneur',
+        'user_username': 'varunmayya',
+        'competitor_usernames': ('elonmusk', 'naval', 'garyvee', 'dharmesh'),
+        'description': 'Business/Startup focused analysis'
+    },
+    '3': {
+        'name': 'Custom',
+        'user_username': '',
+        'competitor_usernames': (),
+        'description': 'Enter your own usernames'
+    }
+}
 
 class DemoTwitterAnalyzer(TwitterCompetitorAnalyzer):
     """Demo version that doesn't require API keys"""
@@ -16,7 +46,7 @@ class DemoTwitterAnalyzer(TwitterCompetitorAnalyzer):
         # Skip parent __init__ to avoid API key requirements
         pass
     
-    async def generate_content_ideas(self, patterns_analysis, competitor_data):
+    async def generate_content_ideas(self, patterns_analysis, competitor_data=None):
         """Use fallback content generation (no API required)"""
         return self._generate_fallback_ideas(patterns_analysis)
 
@@ -31,42 +61,20 @@ def get_demo_input():
     print("📝 Demo Configuration:")
     print()
     
-    # Show available demo profiles
-    demo_profiles = {
-        '1': {
-            'name': '100x Engineer',
-            'user_username': '100xengineers',
-            'competitor_usernames': ['naval', 'sama', 'paulg', 'kentcdodds'],
-            'description': 'Tech/Engineering focused analysis'
-        },
-        '2': {
-            'name': 'Entrepreneur',
-            'user_username': 'varunmayya',
-            'competitor_usernames': ['elonmusk', 'naval', 'garyvee', 'dharmesh'],
-            'description': 'Business/Startup focused analysis'
-        },
-        '3': {
-            'name': 'Custom',
-            'user_username': '',
-            'competitor_usernames': [],
-            'description': 'Enter your own usernames'
-        }
-    }
-    
     print("Choose a demo profile:")
-    for key, profile in demo_profiles.items():
+    for key, profile in DEMO_PROFILES.items():
         print(f"  {key}. {profile['name']} - {profile['description']}")
     
     choice = input("\nEnter choice (1-3): ").strip()
     
-    if choice in demo_profiles:
-        profile = demo_profiles[choice]
+    if choice in DEMO_PROFILES:
+        profile = DEMO_PROFILES[choice]
         
         if choice == '3':
             # Custom input
             user_username = input("Enter your Twitter username: ").strip().replace('@', '')
             competitors_input = input("Enter competitor usernames (comma-separated): ").strip()
-            competitor_usernames = [u.strip().replace('@', '') for u in competitors_input.split(',') if u.strip()]
+            competitor_usernames = HANDLE_RE.findall(competitors_input)
             
             return {
                 'user_username': user_username,
@@ -77,15 +85,15 @@ def get_demo_input():
         else:
             return {
                 'user_username': profile['user_username'],
-                'competitor_usernames': profile['competitor_usernames'],
+                'competitor_usernames': list(profile['competitor_usernames']),
                 'tweets_per_competitor': 10,
                 'auto_discover': True
             }
     else:
         # Default to profile 1
         return {
-            'user_username': '100xengineers',
-            'competitor_usernames': ['naval', 'sama', 'paulg', 'kentcdodds'],
+            'user_username': DEMO_PROFILES['1']['user_username'],
+            'competitor_usernames': list(DEMO_PROFILES['1']['competitor_usernames']),
             'tweets_per_competitor': 10,
             'auto_discover': True
         }
@@ -106,47 +114,52 @@ async def run_demo_analysis(config):
             print(f"🔍 Auto-discovering competitors for @{config['user_username']}...")
             discovered = await analyzer.discover_competitors(config['user_username'], 3)
             final_competitors.extend(discovered)
-            final_competitors = list(set(final_competitors))[:8]  # Limit for demo
             print(f"✅ Discovered additional competitors")
         
+        # Drop repeats in any spelling before fetching, so each account is fetched once
+        final_competitors = unique_handles(final_competitors)[:8]  # Limit for demo
+        
         print(f"\n📊 Analyzing {len(final_competitors)} competitors:")
-        for i, competitor in enumerate(final_competitors, 1):
-            print(f"  {i}. @{competitor}")
-        print()
+        sys.stdout.write("".join(f"  {i}. @{c}\n" for i, c in enumerate(final_competitors, 1)) + "\n")
+        
+        # Fetch every competitor's tweets concurrently (using sample data)
+        fetched = await asyncio.gather(
+            *[analyzer.get_top_performing_tweets(u, config['tweets_per_competitor']) for u in final_competitors],
+            return_exceptions=True
+        )
         
-        # Analyze each competitor's tweets (using sample data)
         competitor_tweets_data = {}
+        total_tweets = 0
         
-        for i, username in enumerate(final_competitors):
-            print(f"📱 [{i+1}/{len(final_competitors)}] Analyzing @{username}...")
+        for i, (username, tweets) in enumerate(zip(final_competitors, fetched)):
+            # Build each competitor's block and write it at once
+            block = [f"📱 [{i+1}/{len(final_competitors)}] Analyzing @{username}..."]
             
-            try:
-                tweets = await analyzer.get_top_performing_tweets(username, config['tweets_per_competitor'])
+            if isinstance(tweets, Exception):
+                block.append(f"  ❌ Error: {str(tweets)}")
+            elif tweets:
+                competitor_tweets_data[username] = tweets
+                total_tweets += len(tweets)
+                avg_engagement = fmean(map(itemgetter('engagement_score'), tweets))
+                block.append(f"  ✅ Found {len(tweets)} tweets (avg engagement: {avg_engagement:.1f})")
                 
-                if tweets:
-                    competitor_tweets_data[username] = tweets
-                    avg_engagement = sum(t['engagement_score'] for t in tweets) / len(tweets)
-                    print(f"  ✅ Found {len(tweets)} tweets (avg engagement: {avg_engagement:.1f})")
-                    
-                    # Show top tweet preview
-                    top_tweet = tweets[0]
-                    print(f"  🔥 Top tweet: \"{top_tweet.get('text', '')[:60]}...\"")
-                else:
-                    print(f"  ⚠️  No tweets found")
-                    
-            except Exception as e:
-                print(f"  ❌ Error: {str(e)}")
-                continue
+                # Show top tweet preview
+                top_tweet = tweets[0]
+                block.append(f"  🔥 Top tweet: \"{top_tweet.get('text', '')[:60]}...\"")
+            else:
+                block.append(f"  ⚠️  No tweets found")
+            
+            sys.stdout.write("\n".join(block) + "\n")
             
-            # Small delay for demo effect
-            await asyncio.sleep(0.5)
+            # Optional delay for demo effect (--slow)
+            if config.get('demo_pacing'):
+                await asyncio.sleep(0.5)
         
         if not competitor_tweets_data:
             print("❌ No competitor data available")
             return False
         
         print(f"\n📈 Successfully analyzed {len(competitor_tweets_data)} competitors")
-        total_tweets = sum(len(tweets) for tweets in competitor_tweets_data.values())
         print(f"📊 Total tweets analyzed: {total_tweets}")
         
         # Analyze patterns
@@ -158,13 +171,14 @@ async def run_demo_analysis(config):
         
         # Generate content ideas (using fallback method)
         print("\n💡 Generating content ideas...")
-        content_ideas = await analyzer.generate_content_ideas(patterns_analysis, competitor_tweets_data)
+        content_ideas = await analyzer.generate_content_ideas(patterns_analysis)
         print_content_ideas(content_ideas)
         
         # Save results
+        now = datetime.now()
         results = {
             "demo": True,
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": now.isoformat(),
             "config": config,
             "analysis_summary": {
                 "competitors_analyzed": len(competitor_tweets_data),
@@ -175,9 +189,8 @@ async def run_demo_analysis(config):
             "content_ideas": content_ideas
         }
         
-        filename = f"demo_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-        with open(filename, 'w') as f:
-            json.dump(results, f, indent=2)
+        filename = f"demo_results_{now.strftime('%Y%m%d_%H%M%S')}.jsonl.gz"
+        write_jsonl_gz(filename, result_records(results), compresslevel=1)
         
         print(f"\n💾 Demo results saved to {filename}")
         print("✅ Demo analysis completed successfully!")
@@ -192,72 +205,80 @@ async def run_demo_analysis(config):
 
 def print_pattern_insights(patterns_analysis):
     """Print pattern analysis insights"""
-    print("\n📊 Pattern Analysis Results:")
-    print("-" * 30)
+    # Pull every section out once; missing or empty ones fall back to shared empty tuples
+    avg_engagement_score = patterns_analysis.get('avg_engagement_score', 0)
+    top_hashtags = (patterns_analysis.get('top_hashtags') or ())[:5]
+    top_hooks = ((patterns_analysis.get('hook_patterns') or {}).get('top_performing_hooks') or ())[:3]
+    topics = (patterns_analysis.get('topic_themes') or ())[:5]
+    length_patterns = patterns_analysis.get('optimal_length') or {}
     
-    print(f"📈 Average engagement score: {patterns_analysis.get('avg_engagement_score', 0):.1f}")
+    out = []
+    out.append("\n📊 Pattern Analysis Results:")
+    out.append("-" * 30)
+    
+    out.append(f"📈 Average engagement score: {avg_engagement_score:.1f}")
     
     # Top hashtags
-    top_hashtags = patterns_analysis.get('top_hashtags', [])[:5]
     if top_hashtags:
-        print(f"\n🏷️  Top Hashtags:")
+        out.append(f"\n🏷️  Top Hashtags:")
         for i, hashtag_data in enumerate(top_hashtags, 1):
-            print(f"  {i}. #{hashtag_data['hashtag']} ({hashtag_data['frequency']} uses)")
+            out.append(f"  {i}. #{hashtag_data['hashtag']} ({hashtag_data['frequency']} uses)")
     
     # Hook patterns
-    hook_patterns = patterns_analysis.get('hook_patterns', {})
-    top_hooks = hook_patterns.get('top_performing_hooks', [])[:3]
     if top_hooks:
-        print(f"\n🎣 Top Performing Hooks:")
+        out.append(f"\n🎣 Top Performing Hooks:")
         for i, hook_data in enumerate(top_hooks, 1):
-            print(f"  {i}. \"{hook_data['hook'][:50]}...\" ({hook_data['engagement_score']:.1f})")
+            out.append(f"  {i}. \"{hook_data['hook'][:50]}...\" ({hook_data['engagement_score']:.1f})")
     
     # Topic themes
-    topics = patterns_analysis.get('topic_themes', [])[:5]
     if topics:
-        print(f"\n📝 Top Topic Themes:")
+        out.append(f"\n📝 Top Topic Themes:")
         for i, topic in enumerate(topics, 1):
-            print(f"  {i}. {topic}")
+            out.append(f"  {i}. {topic}")
     
     # Length patterns
-    length_patterns = patterns_analysis.get('optimal_length', {})
     if length_patterns:
-        print(f"\n📏 Tweet Length Performance:")
-        sorted_lengths = sorted(length_patterns.items(), key=lambda x: x[1].get('avg_engagement', 0), reverse=True)
-        for length_range, data in sorted_lengths[:3]:
+        out.append(f"\n📏 Tweet Length Performance:")
+        top_lengths = heapq.nlargest(3, length_patterns.items(), key=lambda x: x[1].get('avg_engagement', 0))
+        for length_range, data in top_lengths:
             avg_eng = data.get('avg_engagement', 0)
             count = data.get('count', 0)
-            print(f"  • {length_range}: {avg_eng:.1f} avg engagement ({count} tweets)")
+            out.append(f"  • {length_range}: {avg_eng:.1f} avg engagement ({count} tweets)")
+    
+    sys.stdout.write("\n".join(out) + "\n")
 
 def print_content_ideas(content_ideas):
     """Print generated content ideas"""
-    print("\n✨ Generated Content Ideas:")
-    print("-" * 30)
+    out = []
+    out.append("\n✨ Generated Content Ideas:")
+    out.append("-" * 30)
     
     # Tweet ideas
     tweet_ideas = content_ideas.get('tweet_ideas', [])
     if tweet_ideas:
-        print(f"\n🐦 Tweet Ideas ({len(tweet_ideas)}):")
+        out.append(f"\n🐦 Tweet Ideas ({len(tweet_ideas)}):")
         for i, tweet in enumerate(tweet_ideas[:7], 1):
-            print(f"  {i}. {tweet}")
+            out.append(f"  {i}. {tweet}")
         if len(tweet_ideas) > 7:
-            print(f"  ... and {len(tweet_ideas) - 7} more")
+            out.append(f"  ... and {len(tweet_ideas) - 7} more")
     
     # Hook ideas
     hook_ideas = content_ideas.get('hook_ideas', [])
     if hook_ideas:
-        print(f"\n🎣 Hook Ideas ({len(hook_ideas)}):")
+        out.append(f"\n🎣 Hook Ideas ({len(hook_ideas)}):")
         for i, hook in enumerate(hook_ideas[:7], 1):
-            print(f"  {i}. {hook}")
+            out.append(f"  {i}. {hook}")
         if len(hook_ideas) > 7:
-            print(f"  ... and {len(hook_ideas) - 7} more")
+            out.append(f"  ... and {len(hook_ideas) - 7} more")
     
     # Strategy insights
     strategy_insights = content_ideas.get('strategy_insights', [])
     if strategy_insights:
-        print(f"\n📈 Strategy Insights ({len(strategy_insights)}):")
+        out.append(f"\n📈 Strategy Insights ({len(strategy_insights)}):")
         for i, insight in enumerate(strategy_insights, 1):
-            print(f"  {i}. {insight}")
+            out.append(f"  {i}. {insight}")
+    
+    sys.stdout.write("\n".join(out) + "\n")
 
 def main():
     """Main demo CLI function"""
@@ -265,6 +286,7 @@ def main():
     
     # Get demo configuration
     config = get_demo_input()
+    config['demo_pacing'] = '--slow' in sys.argv
     
     # Confirm configuration
     print(f"\n📋 Demo Configuration:")
@@ -283,7 +305,7 @@ def main():
     
     if success:
         print("\n🎉 Demo completed successfully!")
-        print("📊 Check the generated JSON file for detailed results.")
+        print("📊 Check the generated .jsonl.gz file for detailed results.")
         print("\n💡 To run with real Twitter data, set up the API keys:")
         print("   export OPENROUTER_API_KEY='your_key'")
         print("   export APIFY_TOKEN='your_token'")
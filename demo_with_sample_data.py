@@ -3,108 +3,22 @@
 import asyncio
 import json
 import os
+from pathlib import Path
 from main import InstagramReelAnalyzer
+from result_writer import write_json
+from event_loop import install_uvloop
 
-# Sample data that simulates what would be scraped from Instagram
-SAMPLE_COMPETITOR_DATA = {
-    "100xengineers": [
-        {
-            "shortcode": "ABC123",
-            "url": "https://www.instagram.com/reel/ABC123/",
-            "caption": "🚀 Here's the secret to landing your first tech job that nobody tells you about! Stop applying randomly and start doing this instead... #techtips #career #programming",
-            "likes": 15420,
-            "comments": 234,
-            "views": 125000,
-            "engagement_rate": 12.5,
-            "date": "2024-01-15T10:30:00",
-            "hashtags": ["techtips", "career", "programming", "coding", "developer"],
-            "mentions": [],
-            "duration": 28
-        },
-        {
-            "shortcode": "DEF456",
-            "url": "https://www.instagram.com/reel/DEF456/",
-            "caption": "POV: You're debugging for 3 hours and realize you forgot a semicolon 😭 Every developer has been there! What's your worst debugging story? #programming #debugging #coding",
-            "likes": 8765,
-            "comments": 156,
-            "views": 89000,
-            "engagement_rate": 10.2,
-            "date": "2024-01-14T15:45:00",
-            "hashtags": ["programming", "debugging", "coding", "developer", "memes"],
-            "mentions": [],
-            "duration": 15
-        },
-        {
-            "shortcode": "GHI789",
-            "url": "https://www.instagram.com/reel/GHI789/",
-            "caption": "5 productivity hacks every developer needs to know! These changed my coding workflow completely. Save this post for later! #productivity #coding #tips",
-            "likes": 12340,
-            "comments": 189,
-            "views": 98000,
-            "engagement_rate": 12.8,
-            "date": "2024-01-13T09:20:00",
-            "hashtags": ["productivity", "coding", "tips", "developer", "workflow"],
-            "mentions": [],
-            "duration": 32
-        }
-    ],
-    "thevarunmayya": [
-        {
-            "shortcode": "JKL012",
-            "url": "https://www.instagram.com/reel/JKL012/",
-            "caption": "This is why your startup is failing (and how to fix it) 📈 Most founders make these critical mistakes without realizing it... #startup #entrepreneur #business",
-            "likes": 23450,
-            "comments": 312,
-            "views": 187000,
-            "engagement_rate": 12.7,
-            "date": "2024-01-15T14:20:00",
-            "hashtags": ["startup", "entrepreneur", "business", "founder", "growth"],
-            "mentions": [],
-            "duration": 45
-        },
-        {
-            "shortcode": "MNO345",
-            "url": "https://www.instagram.com/reel/MNO345/",
-            "caption": "The harsh truth about building a business in 2024... Everyone talks about overnight success but here's what really happens 💡 #reality #business #truth",
-            "likes": 18900,
-            "comments": 278,
-            "views": 145000,
-            "engagement_rate": 13.2,
-            "date": "2024-01-14T11:30:00",
-            "hashtags": ["reality", "business", "truth", "entrepreneur", "startup"],
-            "mentions": [],
-            "duration": 38
-        }
-    ],
-    "rowancheung": [
-        {
-            "shortcode": "PQR678",
-            "url": "https://www.instagram.com/reel/PQR678/",
-            "caption": "I made $50K with this AI tool in 30 days (step by step tutorial) 🤖 This is changing everything for creators and entrepreneurs... #ai #makemoney #tutorial",
-            "likes": 34500,
-            "comments": 567,
-            "views": 298000,
-            "engagement_rate": 11.8,
-            "date": "2024-01-15T16:45:00",
-            "hashtags": ["ai", "makemoney", "tutorial", "entrepreneur", "passive"],
-            "mentions": [],
-            "duration": 52
-        },
-        {
-            "shortcode": "STU901",
-            "url": "https://www.instagram.com/reel/STU901/",
-            "caption": "Stop doing this if you want to make money online! ❌ I see everyone making this mistake and wondering why they're not successful... #onlinebusiness #mistakes #money",
-            "likes": 19800,
-            "comments": 234,
-            "views": 167000,
-            "engagement_rate": 12.0,
-            "date": "2024-01-14T13:15:00",
-            "hashtags": ["onlinebusiness", "mistakes", "money", "entrepreneur", "tips"],
-            "mentions": [],
-            "duration": 29
-        }
-    ]
-}
+# Sample data that simulates what would be scraped from Instagram, loaded on first use
+SAMPLE_DATA_PATH = Path(__file__).parent / "sample_data.json"
+_sample_data = None
+
+def sample_data():
+    """Load the sample competitor reels from SAMPLE_DATA_PATH, once"""
+    global _sample_data
+    if _sample_data is None:
+        with open(SAMPLE_DATA_PATH, encoding="utf-8") as f:
+            _sample_data = json.load(f)
+    return _sample_data
 
 async def demo_analysis():
     """Demo the Instagram analysis with sample data"""
@@ -120,16 +34,23 @@ async def demo_analysis():
     
     try:
         analyzer = InstagramReelAnalyzer()
+        competitor_data = sample_data()
+        
+        # (reel count, total engagement rate) per competitor, gathered in one pass
+        totals = {
+            username: (len(reels), sum(r['engagement_rate'] for r in reels))
+            for username, reels in competitor_data.items()
+        }
+        total_reels = sum(count for count, _ in totals.values())
         
         print(f"📊 Sample Data Summary:")
-        for username, reels in SAMPLE_COMPETITOR_DATA.items():
-            avg_engagement = sum(r['engagement_rate'] for r in reels) / len(reels)
-            print(f"  @{username}: {len(reels)} reels, avg engagement: {avg_engagement:.1f}%")
+        for username, (count, engagement_total) in totals.items():
+            print(f"  @{username}: {count} reels, avg engagement: {engagement_total / count:.1f}%")
         
-        print(f"\n🔍 Analyzing patterns across {sum(len(reels) for reels in SAMPLE_COMPETITOR_DATA.values())} sample reels...")
+        print(f"\n🔍 Analyzing patterns across {total_reels} sample reels...")
         
         # Run pattern analysis
-        patterns_analysis = await analyzer.analyze_reel_patterns(SAMPLE_COMPETITOR_DATA)
+        patterns_analysis = await analyzer.analyze_reel_patterns(competitor_data)
         
         print(f"\n📋 Pattern Analysis Results:")
         print(f"  • Average engagement rate: {patterns_analysis.get('avg_engagement_rate', 0):.2f}%")
@@ -153,7 +74,7 @@ async def demo_analysis():
         
         # Generate content ideas
         print(f"\n💡 Generating AI-powered content ideas...")
-        content_ideas = await analyzer.generate_content_ideas(patterns_analysis, SAMPLE_COMPETITOR_DATA)
+        content_ideas = await analyzer.generate_content_ideas(patterns_analysis, competitor_data)
         
         print(f"\n✨ Generated Content Ideas:")
         
@@ -179,15 +100,14 @@ async def demo_analysis():
         demo_results = {
             "demo_info": {
                 "note": "This is a demo using sample data to show functionality",
-                "sample_competitors": list(SAMPLE_COMPETITOR_DATA.keys()),
-                "total_sample_reels": sum(len(reels) for reels in SAMPLE_COMPETITOR_DATA.values())
+                "sample_competitors": list(competitor_data.keys()),
+                "total_sample_reels": total_reels
             },
             "patterns_analysis": patterns_analysis,
             "content_ideas": content_ideas
         }
         
-        with open("demo_results.json", "w") as f:
-            json.dump(demo_results, f, indent=2)
+        write_json("demo_results.json", demo_results)
         
         print(f"\n💾 Demo results saved to demo_results.json")
         print(f"\n✅ Demo completed successfully!")
@@ -202,6 +122,8 @@ async def demo_analysis():
         return False
 
 if __name__ == "__main__":
+    install_uvloop()
+    
     success = asyncio.run(demo_analysis())
     
     if success:
@@ -0,0 +1,14 @@
+#!/usr/bin/env python3
+"""
+Event loop setup shared by the command-line entry points
+"""
+
+def install_uvloop() -> bool:
+    """Use libuv's event loop for the aiohttp-heavy work when uvloop is installed"""
+    try:
+        import uvloop
+    except ImportError:
+        return False
+    
+    uvloop.install()
+    return True
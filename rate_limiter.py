@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Async token-bucket rate limiting for Apify/Twitter requests
+"""
+
+import asyncio
+import random
+import time
+import logging
+from typing import Any, Awaitable, Callable, Dict, Mapping, Optional
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+APIFY_HOST = "api.apify.com"
+
+# Twitter/Apify limits are expressed per 15-minute window; one request per
+# second with a small burst keeps us comfortably inside them by default.
+DEFAULT_RATE = 1.0
+DEFAULT_CAPACITY = 8
+
+class AsyncRateLimiter:
+    """Token bucket that refills continuously and adapts to rate-limit headers"""
+    
+    def __init__(self, rate: float = DEFAULT_RATE, capacity: int = DEFAULT_CAPACITY):
+        self.refill_rate = rate  # tokens per second
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self._last_refill = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._last_refill) * self.refill_rate)
+        self._last_refill = now
+    
+    async def acquire(self):
+        """Wait until a token is available and consume it"""
+        async with self._lock:
+            self._refill()
+            while self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.refill_rate)
+                self._refill()
+            self.tokens -= 1
+    
+    def update_from_headers(self, headers: Mapping[str, str]):
+        """Re-derive the refill rate from x-rate-limit-remaining/reset headers"""
+        remaining = headers.get('x-rate-limit-remaining')
+        reset = headers.get('x-rate-limit-reset')
+        if remaining is None or reset is None:
+            return
+        
+        try:
+            remaining = int(remaining)
+            window = max(float(reset) - time.time(), 1)
+        except ValueError:
+            return
+        
+        self._refill()
+        self.tokens = min(self.tokens, remaining)
+        # With nothing left in the window, allow a single request once it resets
+        self.refill_rate = max(remaining, 1) / window
+
+_limiters: Dict[str, AsyncRateLimiter] = {}
+
+def limiter_for(host: str) -> AsyncRateLimiter:
+    """Return the shared limiter for a host, creating it on first use"""
+    if host not in _limiters:
+        _limiters[host] = AsyncRateLimiter()
+    return _limiters[host]
+
+def _retry_after(headers: Optional[Mapping[str, str]]) -> float:
+    try:
+        return float((headers or {}).get('Retry-After', 1))
+    except ValueError:
+        return 1.0
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether call_with_backoff retries this error: HTTP 429 and 5xx responses"""
+    return isinstance(error, aiohttp.ClientResponseError) and (error.status == 429 or error.status >= 500)
+
+async def call_with_backoff(limiter: AsyncRateLimiter, func: Callable[..., Awaitable[Any]],
+                            *args, max_retries: int = 3, **kwargs) -> Any:
+    """Gate a request on the limiter and retry 429/5xx responses with exponential backoff"""
+    for attempt in range(max_retries + 1):
+        await limiter.acquire()
+        try:
+            return await func(*args, **kwargs)
+        except aiohttp.ClientResponseError as e:
+            if not is_retryable(e) or attempt == max_retries:
+                raise
+            
+            if e.headers:
+                limiter.update_from_headers(e.headers)
+            delay = _retry_after(e.headers) * 2 ** attempt + random.uniform(0, 0.3)
+            logger.warning(f"HTTP {e.status}, retrying in {delay:.1f}s (attempt {attempt + 1}/{max_retries})")
+            await asyncio.sleep(delay)
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Helpers for saving analysis results to disk
+"""
+
+import gzip
+import json
+from typing import Any, Dict, Iterable, Iterator, List
+
+try:
+    import orjson
+except ImportError:  # fall back to the stdlib encoder
+    orjson = None
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # record tables fall back to gzip JSON Lines
+    pyarrow = None
+
+def write_json(filename: str, data: Any):
+    """Write data as indented JSON, using orjson when it is installed"""
+    if orjson is not None:
+        with open(filename, 'wb') as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY))
+    else:
+        with open(filename, 'w') as f:
+            json.dump(data, f, indent=2)
+
+def _dumps_line(record: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return (json.dumps(record) + "\n").encode()
+
+def result_records(results: Dict[str, Any], expand: str = "competitor_data") -> Iterator[Dict[str, Any]]:
+    """Split a results dict into one record per section, and one per competitor"""
+    for section, data in results.items():
+        if section == expand:
+            for competitor, competitor_data in data.items():
+                yield {"section": "competitor", "competitor": competitor, "data": competitor_data}
+        else:
+            yield {"section": section, "data": data}
+
+def write_jsonl_gz(filename: str, records: Iterable[Any], compresslevel: int = 3):
+    """Stream records to a gzip-compressed JSON Lines file, encoding one record at a time"""
+    with gzip.open(filename, 'wb', compresslevel=compresslevel) as f:
+        for record in records:
+            f.write(_dumps_line(record))
+
+def write_records_table(stem: str, records: List[Dict[str, Any]]) -> str:
+    """Write flat per-item records as zstd Parquet when pyarrow is installed, else gzip JSON Lines"""
+    if pyarrow is not None:
+        filename = f"{stem}.parquet"
+        pyarrow.parquet.write_table(pyarrow.Table.from_pylist(records), filename, compression="zstd")
+    else:
+        filename = f"{stem}.jsonl.gz"
+        write_jsonl_gz(filename, records)
+    return filename
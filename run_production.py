@@ -4,12 +4,19 @@ Production Twitter Agent Runner - Automated execution with real API calls
 """
 
 import asyncio
-import json
 import os
+import sys
 from datetime import datetime
+from operator import itemgetter
+from statistics import fmean
 from twitter_analyzer import TwitterCompetitorAnalyzer
+from rate_limiter import APIFY_HOST, call_with_backoff, limiter_for
+from scrape_cache import cached_tweets_many, unique_handles
+from result_writer import write_json, write_records_table
+from event_loop import install_uvloop
+from text_format import preview
 
-async def run_production_analysis():
+async def run_production_analysis(use_cache=True):
     """Run production analysis with real API calls"""
     
     print("🐦 Twitter Competitor Analyzer - PRODUCTION RUN")
@@ -35,7 +42,8 @@ async def run_production_analysis():
         'competitor_usernames': ['naval', 'sama', 'paulg', 'garyvee'],  # Manual competitors
         'tweets_per_competitor': 15,  # More tweets for better analysis
         'auto_discover': True,
-        'min_competitors': 8
+        'min_competitors': 8,
+        'use_cache': use_cache
     }
     
     print("📋 Production Configuration:")
@@ -46,6 +54,8 @@ async def run_production_analysis():
     print(f"  • Minimum competitors: {config['min_competitors']}")
     print()
     
+    analyzer = None
+    
     try:
         analyzer = TwitterCompetitorAnalyzer()
         
@@ -69,59 +79,84 @@ async def run_production_analysis():
                 print(f"⚠️  Auto-discovery failed: {e}")
                 print("📝 Continuing with manual competitor list...")
         
-        # Remove duplicates and limit
-        final_competitors = list(set(final_competitors))[:12]  # Limit for production
+        # Remove duplicates in any spelling and limit
+        final_competitors = unique_handles(final_competitors)[:12]  # Limit for production
         
         if len(final_competitors) < 3:
             print("❌ Need at least 3 competitors to analyze")
             return False
         
+        # Start fetching every uncached competitor's tweets in a single Apify run before
+        # printing the list, so the request is in flight while we report. The shared
+        # limiter paces it and backs off with jitter on 429s instead of a fixed pause
+        limiter = limiter_for(APIFY_HOST)
+        fetch_task = asyncio.create_task(cached_tweets_many(
+            final_competitors,
+            config['tweets_per_competitor'],
+            lambda missing: call_with_backoff(
+                limiter, analyzer.get_top_performing_tweets_bulk, missing, config['tweets_per_competitor']
+            ),
+            enabled=config['use_cache']
+        ))
+        
         print(f"\n📊 Final competitor list ({len(final_competitors)} accounts):")
         for i, competitor in enumerate(final_competitors, 1):
             print(f"  {i:2d}. @{competitor}")
         print()
         
-        # Analyze each competitor's tweets
+        try:
+            tweets_by_user = await fetch_task
+        except Exception as e:
+            print(f"❌ Error fetching competitor tweets: {str(e)}")
+            tweets_by_user = {}
+        
         competitor_tweets_data = {}
+        competitor_performance = {}
+        total_tweets = 0
         successful_analyses = 0
         
         for i, username in enumerate(final_competitors):
-            print(f"📱 [{i+1}/{len(final_competitors)}] Analyzing @{username}...")
+            # Build each competitor's block and write it at once
+            block = [f"📱 [{i+1}/{len(final_competitors)}] Analyzing @{username}..."]
+            tweets = tweets_by_user.get(username)
             
-            try:
-                tweets = await analyzer.get_top_performing_tweets(username, config['tweets_per_competitor'])
+            if tweets:
+                competitor_tweets_data[username] = tweets
+                total_tweets += len(tweets)
+                avg_engagement = fmean(map(itemgetter('engagement_score'), tweets))
+                successful_analyses += 1
                 
-                if tweets:
-                    competitor_tweets_data[username] = tweets
-                    avg_engagement = sum(t['engagement_score'] for t in tweets) / len(tweets)
-                    successful_analyses += 1
-                    
-                    print(f"  ✅ Found {len(tweets)} tweets (avg engagement: {avg_engagement:.1f})")
-                    
-                    # Show top tweet preview
-                    top_tweet = tweets[0]
-                    text_preview = top_tweet.get('text', '')[:70] + "..." if len(top_tweet.get('text', '')) > 70 else top_tweet.get('text', '')
-                    print(f"  🔥 Top tweet: \"{text_preview}\"")
-                    print(f"      💫 {top_tweet.get('likes', 0)} likes, {top_tweet.get('retweets', 0)} RTs, {top_tweet.get('replies', 0)} replies")
-                else:
-                    print(f"  ⚠️  No tweets found")
-                    
-            except Exception as e:
-                print(f"  ❌ Error: {str(e)}")
-                continue
-            
-            # Rate limiting delay
-            if i < len(final_competitors) - 1:
-                print(f"  😴 Rate limiting pause...")
-                await asyncio.sleep(3)
+                block.append(f"  ✅ Found {len(tweets)} tweets (avg engagement: {avg_engagement:.1f})")
+                
+                # Show top tweet preview
+                top_tweet = tweets[0]
+                text_preview = preview(top_tweet.get('text', ''), 70)
+                block.append(f"  🔥 Top tweet: \"{text_preview}\"")
+                block.append(f"      💫 {top_tweet.get('likes', 0)} likes, {top_tweet.get('retweets', 0)} RTs, {top_tweet.get('replies', 0)} replies")
+                
+                # Record this competitor's summary for the results file while it's at hand
+                competitor_performance[username] = {
+                    "tweets_analyzed": len(tweets),
+                    "avg_engagement": avg_engagement,
+                    "top_performing_tweet": {
+                        "text": preview(top_tweet['text'], 100),
+                        "engagement_score": top_tweet['engagement_score'],
+                        "metrics": {
+                            "likes": top_tweet['likes'],
+                            "retweets": top_tweet['retweets'],
+                            "replies": top_tweet['replies']
+                        }
+                    }
+                }
+            else:
+                block.append(f"  ⚠️  No tweets found")
             
-            print()
+            sys.stdout.write("\n".join(block) + "\n\n")
         
         if not competitor_tweets_data:
             print("❌ No competitor data available")
             return False
         
-        total_tweets = sum(len(tweets) for tweets in competitor_tweets_data.values())
         print(f"📈 Production Analysis Summary:")
         print(f"  • Competitors successfully analyzed: {successful_analyses}/{len(final_competitors)}")
         print(f"  • Total tweets analyzed: {total_tweets}")
@@ -154,7 +189,7 @@ async def run_production_analysis():
         if top_hooks:
             print("🎣 Highest Performing Hook Examples:")
             for i, hook_data in enumerate(top_hooks, 1):
-                hook_text = hook_data['hook'][:65] + "..." if len(hook_data['hook']) > 65 else hook_data['hook']
+                hook_text = preview(hook_data['hook'], 65)
                 print(f"  {i}. \"{hook_text}\"")
                 print(f"     💫 {hook_data['engagement_score']:.1f} engagement (@{hook_data['competitor']})")
             print()
@@ -232,11 +267,13 @@ async def run_production_analysis():
                 print(f"{i}. {insight}")
             print()
         
-        # Save comprehensive results
+        # Save comprehensive results, stamped with a single clock reading
+        now = datetime.now()
+        stamp = now.strftime('%Y%m%d_%H%M%S')
         results = {
             "production_run": True,
             "ai_generated": ai_generated,
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": now.isoformat(),
             "config": config,
             "execution_summary": {
                 "competitors_analyzed": successful_analyses,
@@ -247,31 +284,22 @@ async def run_production_analysis():
             },
             "patterns_analysis": patterns_analysis,
             "content_ideas": content_ideas,
-            "competitor_performance": {
-                username: {
-                    "tweets_analyzed": len(tweets),
-                    "avg_engagement": sum(t['engagement_score'] for t in tweets) / len(tweets),
-                    "top_performing_tweet": {
-                        "text": tweets[0]['text'][:100] + "..." if len(tweets[0]['text']) > 100 else tweets[0]['text'],
-                        "engagement_score": tweets[0]['engagement_score'],
-                        "metrics": {
-                            "likes": tweets[0]['likes'],
-                            "retweets": tweets[0]['retweets'],
-                            "replies": tweets[0]['replies']
-                        }
-                    } if tweets else None
-                }
-                for username, tweets in competitor_tweets_data.items()
-            }
+            "competitor_performance": competitor_performance
         }
         
-        filename = f"production_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-        with open(filename, 'w') as f:
-            json.dump(results, f, indent=2)
+        filename = f"production_results_{stamp}.json"
+        write_json(filename, results)
+        
+        # Raw per-tweet rows go to a separate table so the JSON stays to aggregates
+        tweets_filename = write_records_table(
+            f"production_tweets_{stamp}",
+            [{**tweet, "competitor": username} for username, tweets in competitor_tweets_data.items() for tweet in tweets]
+        )
         
         print("💾 PRODUCTION RESULTS SUMMARY")
         print("=" * 35)
         print(f"📄 Detailed results: {filename}")
+        print(f"🗃️  Per-tweet data: {tweets_filename}")
         print(f"🎯 Analysis success rate: {(successful_analyses/len(final_competitors)*100):.1f}%")
         print(f"📊 {total_tweets} tweets from {successful_analyses} competitors analyzed")
         print(f"💡 {len(tweet_ideas)} content ideas generated")
@@ -293,10 +321,17 @@ async def run_production_analysis():
         import traceback
         traceback.print_exc()
         return False
+    
+    finally:
+        # Release the analyzer's keep-alive HTTP session
+        if analyzer is not None:
+            await analyzer.close()
 
 def main():
     """Run the production analysis"""
-    success = asyncio.run(run_production_analysis())
+    install_uvloop()
+    
+    success = asyncio.run(run_production_analysis(use_cache='--no-cache' not in sys.argv))
     return success
 
 if __name__ == "__main__":
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Content-addressed on-disk cache for scraped competitor data
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from rate_limiter import APIFY_HOST, call_with_backoff, limiter_for
+
+CACHE_DIR = Path(".cache")
+SCRAPE_TTL = 60 * 60
+# Single and bulk tweet lookups share one key scheme and this lifetime, so a
+# competitor is cached once and goes stale at one time
+TWEETS_TTL = SCRAPE_TTL
+
+def _cache_path(namespace: str, key: Any) -> Path:
+    digest = hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+    return CACHE_DIR / namespace / f"{digest}.json"
+
+def _read_entry(path: Path) -> Optional[dict]:
+    try:
+        with open(path) as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    
+    if entry.get('expires_at', 0) < time.time():
+        return None
+    return entry
+
+def _write_entry(path: Path, entry: dict):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Write to a sibling temp file and rename so readers never see partial JSON
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, 'w') as f:
+        json.dump(entry, f)
+    os.replace(tmp, path)
+
+async def get_or_fetch(namespace: str, key: Any, fetch: Callable[[], Awaitable[Any]],
+                       ttl_seconds: int = SCRAPE_TTL, enabled: bool = True) -> Any:
+    """Return the cached value for key, or await fetch() and cache its non-empty result"""
+    if not enabled:
+        return await fetch()
+    
+    path = _cache_path(namespace, key)
+    entry = await asyncio.to_thread(_read_entry, path)
+    if entry is not None:
+        return entry['data']
+    
+    data = await fetch()
+    if data:
+        entry = {"key": key, "expires_at": time.time() + ttl_seconds, "data": data}
+        await asyncio.to_thread(_write_entry, path, entry)
+    return data
+
+async def get_many_or_fetch(namespace: str, keys: Dict[str, Any],
+                            fetch_missing: Callable[[List[str]], Awaitable[Dict[str, Any]]],
+                            ttl_seconds: int = SCRAPE_TTL, enabled: bool = True) -> Dict[str, Any]:
+    """Return cached values by name, fetching every miss with one fetch_missing(names) call"""
+    if not enabled:
+        return await fetch_missing(list(keys))
+    
+    paths = {name: _cache_path(namespace, key) for name, key in keys.items()}
+    entries = await asyncio.gather(*[asyncio.to_thread(_read_entry, path) for path in paths.values()])
+    values = {name: entry['data'] for name, entry in zip(paths, entries) if entry is not None}
+    
+    missing = [name for name in keys if name not in values]
+    if missing:
+        fetched = await fetch_missing(missing)
+        expires_at = time.time() + ttl_seconds
+        for name in missing:
+            data = fetched.get(name)
+            if data:
+                entry = {"key": keys[name], "expires_at": expires_at, "data": data}
+                await asyncio.to_thread(_write_entry, paths[name], entry)
+                values[name] = data
+    return values
+
+def handle_key(username: str) -> str:
+    """Normalize a Twitter handle for comparisons and cache keys; handles are case-insensitive"""
+    return username.lower()
+
+def unique_handles(handles: Iterable[str]) -> List[str]:
+    """Drop repeated handles in any spelling, keeping the first spelling and input order"""
+    unique = {}
+    for handle in handles:
+        unique.setdefault(handle_key(handle), handle)
+    return list(unique.values())
+
+def _tweets_key(username: str, count: int) -> List[Any]:
+    return ["tw", handle_key(username), count]
+
+def _tag_competitor(tweets: List[Dict[str, Any]], username: str) -> List[Dict[str, Any]]:
+    """Credit cached tweets to the handle they were requested under; entries are keyed by
+    the lowercased handle, so they may carry another spelling or predate the tag"""
+    for tweet in tweets:
+        tweet['competitor'] = username
+    return tweets
+
+async def cached_tweets(username: str, count: int, fetch: Callable[[], Awaitable[Any]],
+                        enabled: bool = True) -> Any:
+    """Cache a competitor's top tweets for the hour, keyed by (handle, count)"""
+    fetched = False
+    
+    async def fetch_and_mark():
+        nonlocal fetched
+        fetched = True
+        return await fetch()
+    
+    tweets = await get_or_fetch("tweets", _tweets_key(username, count), fetch_and_mark, TWEETS_TTL, enabled)
+    return tweets if fetched else _tag_competitor(tweets, username)
+
+async def cached_tweets_many(usernames: List[str], count: int,
+                             fetch_missing: Callable[[List[str]], Awaitable[Dict[str, Any]]],
+                             enabled: bool = True) -> Dict[str, Any]:
+    """Cache several competitors' top tweets for the hour, fetching every miss in one call"""
+    missing = []
+    
+    async def fetch_and_mark(names: List[str]) -> Dict[str, Any]:
+        missing.extend(names)
+        return await fetch_missing(names)
+    
+    tweets_by_user = await get_many_or_fetch(
+        "tweets",
+        {u: _tweets_key(u, count) for u in usernames},
+        fetch_and_mark,
+        TWEETS_TTL,
+        enabled
+    )
+    fresh = set(missing)
+    return {
+        username: tweets if username in fresh else _tag_competitor(tweets, username)
+        for username, tweets in tweets_by_user.items()
+    }
+
+class TweetFetchScheduler:
+    """Start a cached, rate-limited tweet fetch for each competitor as soon as it is known,
+    skipping repeated handles and stopping at a cap"""
+    
+    def __init__(self, fetch_tweets: Callable[[str, int], Awaitable[Any]], count: int, cap: int,
+                 enabled: bool = True, concurrency: int = 8):
+        self.fetch_tweets = fetch_tweets
+        self.count = count
+        self.cap = cap
+        self.enabled = enabled
+        self.tasks: Dict[str, asyncio.Task] = {}  # by handle as first spelled, in schedule order
+        self._handles = set()
+        self._sem = asyncio.Semaphore(concurrency)
+        self._limiter = limiter_for(APIFY_HOST)
+    
+    async def _fetch(self, username: str) -> Any:
+        async with self._sem:
+            return await cached_tweets(
+                username,
+                self.count,
+                lambda: call_with_backoff(self._limiter, self.fetch_tweets, username, self.count),
+                enabled=self.enabled
+            )
+    
+    def schedule(self, username: str):
+        """Start fetching username unless its handle is already scheduled or the cap is reached"""
+        key = handle_key(username)
+        if key not in self._handles and len(self.tasks) < self.cap:
+            self._handles.add(key)
+            self.tasks[username] = asyncio.create_task(self._fetch(username))
@@ -1,11 +1,13 @@
 #!/usr/bin/env python3
 
 import asyncio
-import json
 import os
 import sys
 from datetime import datetime
 from main import InstagramReelAnalyzer
+from scrape_cache import SCRAPE_TTL, get_or_fetch
+from result_writer import write_json, write_records_table
+from event_loop import install_uvloop
 
 async def test_integration():
     """Integration test: analyze Instagram competitors and generate content ideas"""
@@ -32,35 +34,45 @@ async def test_integration():
         
         print(f"\n🔍 Analyzing {len(test_competitors)} test competitors...")
         competitor_reels_data = {}
-        
-        for i, username in enumerate(test_competitors, 1):
+        total_reels = 0
+        
+        # Fetch every competitor concurrently; smaller count for testing, and reruns
+        # within the hour reuse the cached scrape
+        fetched = await asyncio.gather(
+            *[get_or_fetch(
+                "reels",
+                ["ig", username.lower(), 10],
+                lambda username=username: analyzer.get_top_performing_reels(username, count=10),
+                SCRAPE_TTL
+            ) for username in test_competitors],
+            return_exceptions=True
+        )
+        
+        for i, (username, reels) in enumerate(zip(test_competitors, fetched), 1):
             print(f"  [{i}/{len(test_competitors)}] Analyzing @{username}...")
             
-            try:
-                reels = await analyzer.get_top_performing_reels(username, count=10)  # Smaller count for testing
-                
-                if reels:
-                    competitor_reels_data[username] = reels
-                    avg_engagement = sum(r['engagement_rate'] for r in reels) / len(reels)
-                    print(f"    ✅ Success - {len(reels)} reels, avg engagement: {avg_engagement:.2f}%")
-                    
-                    # Show top performing reel
-                    top_reel = reels[0]
-                    print(f"    📈 Top reel: {top_reel.get('engagement_rate', 0):.2f}% engagement")
-                    print(f"    📝 Caption preview: {top_reel.get('caption', '')[:100]}...")
-                else:
-                    print(f"    ⚠️  No reels found for @{username}")
-                    
-            except Exception as e:
-                print(f"    ❌ Failed to analyze @{username}: {str(e)}")
+            if isinstance(reels, Exception):
+                print(f"    ❌ Failed to analyze @{username}: {str(reels)}")
                 continue
+            
+            if reels:
+                competitor_reels_data[username] = reels
+                total_reels += len(reels)
+                avg_engagement = sum(r['engagement_rate'] for r in reels) / len(reels)
+                print(f"    ✅ Success - {len(reels)} reels, avg engagement: {avg_engagement:.2f}%")
+                
+                # Show top performing reel
+                top_reel = reels[0]
+                print(f"    📈 Top reel: {top_reel.get('engagement_rate', 0):.2f}% engagement")
+                print(f"    📝 Caption preview: {top_reel.get('caption', '')[:100]}...")
+            else:
+                print(f"    ⚠️  No reels found for @{username}")
         
         if not competitor_reels_data:
             print("❌ No competitor data available - cannot proceed with analysis")
             return False
         
         print(f"\n📊 Successfully analyzed {len(competitor_reels_data)} competitors")
-        total_reels = sum(len(reels) for reels in competitor_reels_data.values())
         print(f"📈 Total reels analyzed: {total_reels}")
         
         # Analyze patterns
@@ -122,10 +134,16 @@ async def test_integration():
             }
         }
         
-        with open("instagram_test_results.json", "w") as f:
-            json.dump(test_results, f, indent=2)
+        write_json("instagram_test_results.json", test_results)
+        
+        # Raw per-reel rows go to a separate table so the JSON stays to aggregates
+        reels_filename = write_records_table(
+            "instagram_test_reels",
+            [{**reel, "competitor": username} for username, reels in competitor_reels_data.items() for reel in reels]
+        )
         
         print(f"\n💾 Comprehensive test results saved to instagram_test_results.json")
+        print(f"🗃️  Per-reel data saved to {reels_filename}")
         print("✅ Instagram integration test completed successfully!")
         
         return True
@@ -144,6 +162,8 @@ def main():
     print("⏱️  Note: This may take a few minutes as we analyze Instagram data...")
     print()
     
+    install_uvloop()
+    
     success = asyncio.run(test_integration())
     
     if success:
@@ -1,11 +1,22 @@
 #!/usr/bin/env python3
 
 import asyncio
-import json
+import logging
 import os
+import sys
+from operator import itemgetter
+from statistics import fmean
+from typing import Any, Dict, List
 from main import InstagramReelAnalyzer
+from rate_limiter import APIFY_HOST, call_with_backoff, limiter_for
+from result_writer import write_json
+from scrape_cache import SCRAPE_TTL, get_or_fetch
+from event_loop import install_uvloop
+from text_format import numbered_lines
 
-async def test_simple():
+logger = logging.getLogger(__name__)
+
+async def test_simple(use_cache: bool = True) -> bool:
     """Simple test with direct input - bypasses Apify Actor input system"""
     
     if not os.getenv('OPENROUTER_API_KEY'):
@@ -21,24 +32,43 @@ async def test_simple():
         analyzer = InstagramReelAnalyzer()
         
         print(f"🔍 Analyzing {len(test_competitors)} competitors...")
-        competitor_reels_data = {}
         
-        for username in test_competitors:
-            print(f"  📱 Analyzing @{username}...")
+        # Fetch competitors concurrently, bounded and paced for the scraper's rate limits;
+        # small count to avoid rate limits, and reruns within the hour reuse the cached scrape
+        sem = asyncio.Semaphore(3)
+        limiter = limiter_for(APIFY_HOST)
+        
+        async def fetch(username: str) -> List[Dict[str, Any]]:
+            async with sem:
+                return await get_or_fetch(
+                    "reels",
+                    ["ig", username.lower(), 5],
+                    lambda: call_with_backoff(limiter, analyzer.get_top_performing_reels, username, count=5),
+                    SCRAPE_TTL,
+                    enabled=use_cache
+                )
+        
+        fetched = await asyncio.gather(*[fetch(u) for u in test_competitors], return_exceptions=True)
+        competitor_reels_data: Dict[str, List[Dict[str, Any]]] = {
+            username: reels for username, reels in zip(test_competitors, fetched)
+            if reels and not isinstance(reels, Exception)
+        }
+        
+        out = []
+        for username, reels in zip(test_competitors, fetched):
+            out.append(f"  📱 Analyzing @{username}...")
             
-            try:
-                reels = await analyzer.get_top_performing_reels(username, count=5)  # Small count to avoid rate limits
-                
-                if reels:
-                    competitor_reels_data[username] = reels
-                    avg_engagement = sum(r['engagement_rate'] for r in reels) / len(reels)
-                    print(f"    ✅ Success - {len(reels)} reels, avg engagement: {avg_engagement:.2f}%")
-                else:
-                    print(f"    ⚠️  No reels found for @{username}")
-                    
-            except Exception as e:
-                print(f"    ❌ Error analyzing @{username}: {str(e)}")
+            if isinstance(reels, Exception):
+                out.append(f"    ❌ Error analyzing @{username}: {str(reels)}")
                 continue
+            
+            if reels:
+                avg_engagement = fmean(map(itemgetter('engagement_rate'), reels))
+                out.append(f"    ✅ Success - {len(reels)} reels, avg engagement: {avg_engagement:.2f}%")
+            else:
+                out.append(f"    ⚠️  No reels found for @{username}")
+        
+        sys.stdout.write("\n".join(out) + "\n")
         
         if not competitor_reels_data:
             print("❌ No competitor data available")
@@ -50,29 +80,29 @@ async def test_simple():
         patterns_analysis = await analyzer.analyze_reel_patterns(competitor_reels_data)
         content_ideas = await analyzer.generate_content_ideas(patterns_analysis, competitor_reels_data)
         
-        print(f"\n✨ Sample Generated Ideas:")
+        out = []
+        out.append(f"\n✨ Sample Generated Ideas:")
         
         topic_ideas = content_ideas.get('topic_ideas', [])[:3]
         hook_ideas = content_ideas.get('hook_ideas', [])[:3]
         
-        print(f"\n🎯 Topic Ideas:")
-        for i, topic in enumerate(topic_ideas, 1):
-            print(f"  {i}. {topic}")
+        out.append(f"\n🎯 Topic Ideas:")
+        out.extend(numbered_lines(topic_ideas))
         
-        print(f"\n🎣 Hook Ideas:")
-        for i, hook in enumerate(hook_ideas, 1):
-            print(f"  {i}. {hook}")
+        out.append(f"\n🎣 Hook Ideas:")
+        out.extend(numbered_lines(hook_ideas))
+        
+        sys.stdout.write("\n".join(out) + "\n")
         
         # Save simplified results
         results = {
             "competitors_analyzed": list(competitor_reels_data.keys()),
-            "total_reels": sum(len(reels) for reels in competitor_reels_data.values()),
+            "total_reels": sum(map(len, competitor_reels_data.values())),
             "patterns_analysis": patterns_analysis,
             "content_ideas": content_ideas
         }
         
-        with open("simple_test_results.json", "w") as f:
-            json.dump(results, f, indent=2)
+        await asyncio.to_thread(write_json, "simple_test_results.json", results)
         
         print(f"\n💾 Results saved to simple_test_results.json")
         print("✅ Test completed successfully!")
@@ -81,11 +111,12 @@ async def test_simple():
         
     except Exception as e:
         print(f"❌ Test failed: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Instagram analyzer test failed")
         return False
 
 if __name__ == "__main__":
-    success = asyncio.run(test_simple())
+    install_uvloop()
+    
+    success = asyncio.run(test_simple(use_cache='--no-cache' not in sys.argv))
     if not success:
         print("\n💡 Instagram scraping can be rate-limited. Try again in a few minutes or use different accounts.")
\ No newline at end of file
@@ -1,13 +1,25 @@
 #!/usr/bin/env python3
 
 import asyncio
-import json
+import aiohttp
+import logging
 import os
+import sys
 from datetime import datetime
+from math import fsum
+from operator import itemgetter
+from typing import Any, Dict, List, Optional
 from twitter_analyzer import TwitterCompetitorAnalyzer
+from rate_limiter import APIFY_HOST, call_with_backoff, limiter_for
+from result_writer import write_json
+from scrape_cache import cached_tweets_many
+from event_loop import install_uvloop
+from text_format import numbered_lines
 
-async def test_twitter_analysis():
-    """Test Twitter competitor analysis with sample data"""
+logger = logging.getLogger(__name__)
+
+async def test_twitter_analysis(use_cache: bool = True, analyzer: Optional[TwitterCompetitorAnalyzer] = None) -> bool:
+    """Test Twitter competitor analysis with sample data, optionally reusing a caller's analyzer"""
     
     if not os.getenv('OPENROUTER_API_KEY'):
         print("❌ OPENROUTER_API_KEY environment variable not set")
@@ -21,89 +33,119 @@ async def test_twitter_analysis():
     # Test with popular tech Twitter accounts
     test_competitors = ["naval", "sama", "paulg"]
     
+    # Without a caller's analyzer, open one keep-alive session for every API call in the run,
+    # without carrying cookies between requests
+    session = None
+    
     try:
-        analyzer = TwitterCompetitorAnalyzer()
+        if analyzer is None:
+            session = aiohttp.ClientSession(cookie_jar=aiohttp.DummyCookieJar())
+            analyzer = TwitterCompetitorAnalyzer(session=session)
         
         print(f"🔍 Analyzing {len(test_competitors)} Twitter competitors...")
-        competitor_tweets_data = {}
         
+        # Fetch every competitor's tweets in one paced Apify run; reruns within the hour
+        # reuse the cached tweets and only scrape the accounts that missed
+        limiter = limiter_for(APIFY_HOST)
+        try:
+            tweets_by_user = await cached_tweets_many(
+                test_competitors,
+                10,
+                lambda missing: call_with_backoff(limiter, analyzer.get_top_performing_tweets_bulk, missing, 10),
+                enabled=use_cache
+            )
+        except Exception as e:
+            print(f"❌ Error fetching competitor tweets: {str(e)}")
+            tweets_by_user = {}
+        
+        competitor_tweets_data: Dict[str, List[Dict[str, Any]]] = {u: tweets_by_user[u] for u in test_competitors if tweets_by_user.get(u)}
+        score_totals: Dict[str, float] = {
+            username: fsum(map(itemgetter('engagement_score'), tweets))
+            for username, tweets in competitor_tweets_data.items()
+        }
+        
+        out = []
         for i, username in enumerate(test_competitors, 1):
-            print(f"  [{i}/{len(test_competitors)}] Analyzing @{username}...")
+            out.append(f"  [{i}/{len(test_competitors)}] Analyzing @{username}...")
+            tweets = competitor_tweets_data.get(username)
             
-            try:
-                tweets = await analyzer.get_top_performing_tweets(username, count=10)
+            if tweets:
+                avg_engagement = score_totals[username] / len(tweets)
+                out.append(f"    ✅ Success - {len(tweets)} tweets, avg engagement: {avg_engagement:.1f}")
                 
-                if tweets:
-                    competitor_tweets_data[username] = tweets
-                    avg_engagement = sum(t['engagement_score'] for t in tweets) / len(tweets)
-                    print(f"    ✅ Success - {len(tweets)} tweets, avg engagement: {avg_engagement:.1f}")
-                    
-                    # Show top performing tweet
-                    top_tweet = tweets[0]
-                    print(f"    🔥 Top tweet: {top_tweet.get('engagement_score', 0):.1f} engagement")
-                    print(f"    📝 Text preview: {top_tweet.get('text', '')[:80]}...")
-                else:
-                    print(f"    ⚠️  No tweets found for @{username}")
-                    
-            except Exception as e:
-                print(f"    ❌ Error analyzing @{username}: {str(e)}")
-                continue
+                # Show top performing tweet
+                top_tweet = tweets[0]
+                out.append(f"    🔥 Top tweet: {top_tweet.get('engagement_score', 0):.1f} engagement")
+                out.append(f"    📝 Text preview: {top_tweet.get('text', '')[:80]}...")
+            else:
+                out.append(f"    ⚠️  No tweets found for @{username}")
+        
+        sys.stdout.write("\n".join(out) + "\n")
         
         if not competitor_tweets_data:
             print("❌ No competitor data available")
             return False
         
         print(f"\n📊 Successfully analyzed {len(competitor_tweets_data)} competitors")
-        total_tweets = sum(len(tweets) for tweets in competitor_tweets_data.values())
+        total_tweets = sum(map(len, competitor_tweets_data.values()))
         print(f"📈 Total tweets analyzed: {total_tweets}")
         
         # Analyze patterns
         print("\n🔍 Analyzing patterns across competitor tweets...")
-        patterns_analysis = await analyzer.analyze_tweet_patterns(competitor_tweets_data)
-        
-        print(f"📋 Pattern Analysis Results:")
-        print(f"  • Average engagement score: {patterns_analysis.get('avg_engagement_score', 0):.1f}")
-        print(f"  • Top hashtags found: {len(patterns_analysis.get('top_hashtags', []))}")
-        print(f"  • Hook patterns analyzed: {patterns_analysis.get('hook_patterns', {}).get('total_hooks_analyzed', 0)}")
-        print(f"  • Topic themes identified: {len(patterns_analysis.get('topic_themes', []))}")
+        patterns_analysis = await analyzer.analyze_tweet_patterns(competitor_tweets_data, score_totals)
+        
+        # Pull each section out once; missing or empty ones fall back to empty values
+        avg_engagement_score = patterns_analysis.get('avg_engagement_score', 0)
+        top_hashtags = patterns_analysis.get('top_hashtags') or []
+        hook_patterns = patterns_analysis.get('hook_patterns') or {}
+        top_hooks = hook_patterns.get('top_performing_hooks') or []
+        topic_themes = patterns_analysis.get('topic_themes') or []
+        
+        out = []
+        out.append(f"📋 Pattern Analysis Results:")
+        out.append(f"  • Average engagement score: {avg_engagement_score:.1f}")
+        out.append(f"  • Top hashtags found: {len(top_hashtags)}")
+        out.append(f"  • Hook patterns analyzed: {hook_patterns.get('total_hooks_analyzed', 0)}")
+        out.append(f"  • Topic themes identified: {len(topic_themes)}")
         
         # Show some specific insights
-        top_hashtags = patterns_analysis.get('top_hashtags', [])[:3]
         if top_hashtags:
-            print(f"\n🏷️  Top Hashtags:")
-            for i, hashtag_data in enumerate(top_hashtags, 1):
-                print(f"   {i}. #{hashtag_data['hashtag']} (used {hashtag_data['frequency']} times)")
+            out.append(f"\n🏷️  Top Hashtags:")
+            for i, hashtag_data in enumerate(top_hashtags[:3], 1):
+                out.append(f"   {i}. #{hashtag_data['hashtag']} (used {hashtag_data['frequency']} times)")
         
-        hook_patterns = patterns_analysis.get('hook_patterns', {})
-        top_hooks = hook_patterns.get('top_performing_hooks', [])[:3]
         if top_hooks:
-            print(f"\n🎣 Top Performing Hooks:")
-            for i, hook_data in enumerate(top_hooks, 1):
-                print(f"   {i}. \"{hook_data['hook']}\" ({hook_data['engagement_score']:.1f} engagement)")
+            out.append(f"\n🎣 Top Performing Hooks:")
+            for i, hook_data in enumerate(top_hooks[:3], 1):
+                out.append(f"   {i}. \"{hook_data['hook']}\" ({hook_data['engagement_score']:.1f} engagement)")
+        
+        sys.stdout.write("\n".join(out) + "\n")
         
         # Generate content ideas
         print(f"\n💡 Generating AI-powered content ideas...")
         content_ideas = await analyzer.generate_content_ideas(patterns_analysis, competitor_tweets_data)
         
-        print(f"\n✨ Generated Content Ideas:")
+        # Pull each idea list out once
+        tweet_ideas = content_ideas.get('tweet_ideas', [])
+        hook_ideas = content_ideas.get('hook_ideas', [])
+        strategy_insights = content_ideas.get('strategy_insights', [])
+        
+        out = []
+        out.append(f"\n✨ Generated Content Ideas:")
         
         # Show tweet ideas
-        tweet_ideas = content_ideas.get('tweet_ideas', [])
-        print(f"\n🐦 Tweet Ideas ({len(tweet_ideas)}):")
-        for i, tweet in enumerate(tweet_ideas[:5], 1):
-            print(f"  {i}. {tweet}")
+        out.append(f"\n🐦 Tweet Ideas ({len(tweet_ideas)}):")
+        out.extend(numbered_lines(tweet_ideas[:5]))
         
         # Show hook ideas
-        hook_ideas = content_ideas.get('hook_ideas', [])
-        print(f"\n🎣 Hook Ideas ({len(hook_ideas)}):")
-        for i, hook in enumerate(hook_ideas[:5], 1):
-            print(f"  {i}. {hook}")
+        out.append(f"\n🎣 Hook Ideas ({len(hook_ideas)}):")
+        out.extend(numbered_lines(hook_ideas[:5]))
         
         # Show strategy insights
-        strategy_insights = content_ideas.get('strategy_insights', [])
-        print(f"\n📈 Strategy Insights ({len(strategy_insights)}):")
-        for i, insight in enumerate(strategy_insights, 1):
-            print(f"  {i}. {insight}")
+        out.append(f"\n📈 Strategy Insights ({len(strategy_insights)}):")
+        out.extend(numbered_lines(strategy_insights))
+        
+        sys.stdout.write("\n".join(out) + "\n")
         
         # Save test results
         test_results = {
@@ -116,14 +158,13 @@ async def test_twitter_analysis():
             "analysis_summary": {
                 "competitors_analyzed": len(competitor_tweets_data),
                 "total_tweets_analyzed": total_tweets,
-                "avg_engagement_score": patterns_analysis.get('avg_engagement_score', 0)
+                "avg_engagement_score": avg_engagement_score
             },
             "patterns_analysis": patterns_analysis,
             "content_ideas": content_ideas
         }
         
-        with open("twitter_test_results.json", "w") as f:
-            json.dump(test_results, f, indent=2)
+        await asyncio.to_thread(write_json, "twitter_test_results.json", test_results)
         
         print(f"\n💾 Test results saved to twitter_test_results.json")
         print("✅ Twitter analysis test completed successfully!")
@@ -132,16 +173,46 @@ async def test_twitter_analysis():
         
     except Exception as e:
         print(f"❌ Test failed: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Twitter analysis test failed")
         return False
+    
+    finally:
+        if session is not None:
+            await session.close()
+
+async def run_repeated(repeat: int, use_cache: bool = True) -> bool:
+    """Run the test repeat times in one process, reusing one analyzer and its warm HTTP session"""
+    async with aiohttp.ClientSession(cookie_jar=aiohttp.DummyCookieJar()) as session:
+        try:
+            analyzer = TwitterCompetitorAnalyzer(session=session)
+        except Exception as e:
+            print(f"❌ Test failed: {str(e)}")
+            return False
+        results = [await test_twitter_analysis(use_cache, analyzer) for _ in range(repeat)]
+    return all(results)
 
 if __name__ == "__main__":
     print("🐦 Twitter Competitor Analysis - Test")
     print("This test analyzes Twitter competitors using sample data")
     print()
     
-    success = asyncio.run(test_twitter_analysis())
+    install_uvloop()
+    
+    use_cache = '--no-cache' not in sys.argv
+    
+    # --repeat N reruns the test in this process, skipping interpreter and connection startup
+    repeat = 1
+    if '--repeat' in sys.argv:
+        value = sys.argv[sys.argv.index('--repeat') + 1:][:1]
+        if not value or not value[0].isdigit() or int(value[0]) < 1:
+            print("❌ --repeat needs a positive integer, e.g. --repeat 3")
+            sys.exit(2)
+        repeat = int(value[0])
+    
+    if repeat > 1:
+        success = asyncio.run(run_repeated(repeat, use_cache))
+    else:
+        success = asyncio.run(test_twitter_analysis(use_cache=use_cache))
     
     if success:
         print("\n🎉 Twitter analysis is working correctly!")
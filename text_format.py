@@ -0,0 +1,14 @@
+#!/usr/bin/env python3
+"""
+Text helpers shared by the analyzer and the command-line reports
+"""
+
+from typing import Any, Iterable, Iterator
+
+def preview(text: str, limit: int = 200) -> str:
+    """Cut text to limit characters with an ellipsis, slicing only when it is too long"""
+    return text if len(text) <= limit else text[:limit] + "..."
+
+def numbered_lines(items: Iterable[Any]) -> Iterator[str]:
+    """Format items as indented, 1-based numbered lines"""
+    return (f"  {i}. {item}" for i, item in enumerate(items, 1))
@@ -2,19 +2,194 @@
 
 import os
 import asyncio
+import bisect
+import functools
+import heapq
 import json
 import re
-from typing import List, Dict, Any, Optional
+from collections import Counter
+from itertools import chain
+from operator import itemgetter
+from typing import List, Dict, Any, Optional, AsyncIterator, Tuple
 from datetime import datetime, timedelta
 from apify import Actor
 import aiohttp
 import logging
+from rate_limiter import APIFY_HOST, call_with_backoff, is_retryable, limiter_for
+from scrape_cache import unique_handles
+from text_format import preview
+
+try:
+    import orjson
+except ImportError:  # fall back to the stdlib decoder
+    orjson = None
+
+# Decoder for inbound API responses, using orjson when it's installed
+json_loads = orjson.loads if orjson is not None else json.loads
+
+def json_dumps_indent(obj: Any) -> str:
+    """Serialize obj as 2-space indented JSON, using orjson when it's installed"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+    return json.dumps(obj, indent=2)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Text-cleaning pattern for topic extraction: hashtags/mentions, URLs and punctuation in one pass
+CLEAN_RE = re.compile(r'[#@]\w+|http\S+|[^\w\s]')
+
+# Words too common to count as topic themes
+COMMON_WORDS = frozenset({'the', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'is', 'are', 'was', 'were', 'be', 'been', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should', 'may', 'might', 'can', 'cant', 'dont', 'wont', 'this', 'that', 'these', 'those', 'a', 'an', 'you', 'your', 'if', 'how', 'why', 'what', 'when', 'where'})
+
+# Tweet length buckets: inclusive upper bounds and the label for each range
+LENGTH_BOUNDS = (50, 100, 200)
+LENGTH_LABELS = ("0-50 chars", "51-100 chars", "101-200 chars", "200+ chars")
+
+# Seed competitor accounts for the simulated discovery, by niche
+ENGINEER_COMPETITORS = (
+    "naval", "elonmusk", "sama", "paulg", "dhh", "kentcdodds",
+    "dan_abramov", "ryanflorence", "wesbos", "addyosmani"
+)
+ENTREPRENEUR_COMPETITORS = (
+    "elonmusk", "naval", "sama", "paulg", "garyvee", "dharmesh",
+    "neerajkaushal", "kunalshah", "rohitjain_007", "rahulvohra"
+)
+GENERAL_COMPETITORS = (
+    "naval", "sama", "paulg", "garyvee", "dharmesh", "kentcdodds",
+    "dan_abramov", "wesbos", "addyosmani", "elonmusk"
+)
+
+@functools.lru_cache(maxsize=256)
+def _discover_competitors_sync(key: str, min_competitors: int) -> Tuple[str, ...]:
+    """Pick competitor accounts for a lowercased username, memoized per (key, min_competitors)"""
+    if "100xengineers" in key or "engineer" in key:
+        competitors = ENGINEER_COMPETITORS
+    elif "varun" in key or "entrepreneur" in key:
+        competitors = ENTREPRENEUR_COMPETITORS
+    else:
+        # General tech/business accounts
+        competitors = GENERAL_COMPETITORS
+    # Ordered dedup, so every process picks the same accounts in the same order
+    return tuple(dict.fromkeys(competitors))[:min_competitors * 2]
+
+@functools.lru_cache(maxsize=8192)
+def _parse_iso(timestamp: str) -> Tuple[str, int]:
+    """Parse an ISO timestamp into its (weekday name, hour), memoized for repeated timestamps"""
+    date = datetime.fromisoformat(timestamp[:-1] + '+00:00' if timestamp.endswith('Z') else timestamp)
+    return date.strftime('%A'), date.hour
+
+# Keywords that imply hashtags for simulated tweets, in priority order
+TEMPLATE_TAG_RULES = (
+    (("javascript", "js"), ("javascript", "webdev", "coding")),
+    (("react",), ("react", "frontend", "webdev")),
+    (("startup",), ("startup", "entrepreneur", "business")),
+    (("developer", "coding"), ("developer", "coding", "programming")),
+    (("css",), ("css", "webdev", "frontend")),
+    (("docker",), ("docker", "devops", "containers"))
+)
+# Finds every keyword occurrence in one scan; the lookahead keeps overlapping keywords visible
+TEMPLATE_KEYWORD_RE = re.compile(
+    '(?=(' + '|'.join(keyword for keywords, _ in TEMPLATE_TAG_RULES for keyword in keywords) + '))'
+)
+
+def _extract_hashtags_from_template(text: str) -> List[str]:
+    """Extract or infer hashtags from tweet content"""
+    found = set(TEMPLATE_KEYWORD_RE.findall(text.lower()))
+    hashtags = []
+    for keywords, tags in TEMPLATE_TAG_RULES:
+        if not found.isdisjoint(keywords):
+            hashtags.extend(tags)
+            if len(hashtags) >= 3:
+                break
+    
+    return hashtags[:3]  # Limit to 3 hashtags
+
+# Simulated tweet templates by niche, with their inferred hashtags worked out once at import
+ENGINEER_TEMPLATES = (
+    "🚀 Here's the secret to 10x your coding productivity that most developers miss:",
+    "Stop doing this if you want to become a senior developer:",
+    "The harsh truth about landing your first tech job in 2024:",
+    "5 JavaScript concepts that will make you a better developer:",
+    "Why most developers fail at system design interviews:",
+    "This React pattern changed how I write components forever:",
+    "The #1 mistake junior developers make with databases:",
+    "How to debug like a senior developer (thread):",
+    "CSS tricks that will blow your mind:",
+    "Docker concepts every developer should know:"
+)
+ENTREPRENEUR_TEMPLATES = (
+    "🔥 The startup advice that nobody gives you:",
+    "This is why 90% of startups fail (and how to avoid it):",
+    "The harsh reality of building a unicorn startup:",
+    "Fundraising lessons I learned the hard way:",
+    "How to build a product people actually want:",
+    "The entrepreneurship myths that are keeping you broke:",
+    "Why most business ideas fail before they start:",
+    "Building a team when you have no money:",
+    "The psychology of successful entrepreneurs:",
+    "Scaling from 0 to $1M ARR (lessons learned):"
+)
+GENERAL_TEMPLATES = (
+    "The best advice I ever received:",
+    "This changed my entire perspective on success:",
+    "Here's what I wish I knew 5 years ago:",
+    "The uncomfortable truth about building wealth:",
+    "Why most people never reach their potential:",
+    "This mindset shift transformed my career:",
+    "The skills that actually matter in 2024:",
+    "How to think like a successful person:",
+    "The difference between busy and productive:",
+    "Why networking is overrated (and what works instead):"
+)
+ENGINEER_TEMPLATE_TAGS = tuple(tuple(_extract_hashtags_from_template(t)) for t in ENGINEER_TEMPLATES)
+ENTREPRENEUR_TEMPLATE_TAGS = tuple(tuple(_extract_hashtags_from_template(t)) for t in ENTREPRENEUR_TEMPLATES)
+GENERAL_TEMPLATE_TAGS = tuple(tuple(_extract_hashtags_from_template(t)) for t in GENERAL_TEMPLATES)
+
+# Prompt for the content idea request, filled in per analysis with str.format
+CONTENT_IDEAS_PROMPT = """
+Based on this comprehensive Twitter competitor analysis, generate content ideas:
+
+ANALYSIS SUMMARY:
+- Total tweets analyzed: {total_tweets}
+- Average engagement score: {avg_score:.1f}
+- Top hashtags: {top_hashtags}
+- Common topic themes: {topic_themes}
+- Top performing hook starters: {hook_starters}
+- Engagement insights: {engagement_insights}
+
+TOP PERFORMING CONTENT EXAMPLES:
+{top_content}
+
+Please generate:
+
+1. **TWEET IDEAS** (10 high-engagement tweet concepts):
+   - Focus on topics that competitors are succeeding with but could be improved
+   - Include various formats: questions, threads, tips, controversial takes
+   - Use successful patterns but make them unique
+
+2. **HOOK IDEAS** (15 compelling hook formulas based on top-performing patterns):
+   - Use successful hook starters but make them fresh
+   - Focus on hooks that generated high engagement
+   - Include various hook types (question, statement, story, controversial, etc.)
+
+3. **CONTENT STRATEGY INSIGHTS** (5 key strategic recommendations):
+   - Optimal posting patterns and timing
+   - Content structure recommendations based on length analysis
+   - Engagement strategies based on analysis
+   - Hashtag and topic strategies
+
+Format as JSON with keys: "tweet_ideas", "hook_ideas", "strategy_insights"
+"""
+
 class TwitterCompetitorAnalyzer:
-    def __init__(self):
+    # Shared HTTP session, either supplied by the caller or opened lazily on first use
+    session: Optional[aiohttp.ClientSession] = None
+    _owns_session = False
+    
+    def __init__(self, session: Optional[aiohttp.ClientSession] = None):
+        self.session = session
+        
         self.openrouter_api_key = os.getenv('OPENROUTER_API_KEY')
         if not self.openrouter_api_key:
             raise ValueError("OPENROUTER_API_KEY environment variable is required")
@@ -25,10 +200,12 @@ class TwitterCompetitorAnalyzer:
     
     async def discover_competitors(self, username: str, min_competitors: int = 5) -> List[str]:
         """Discover competitor accounts based on user's Twitter profile"""
+        return [competitor async for competitor in self.iter_competitors(username, min_competitors)]
+    
+    async def iter_competitors(self, username: str, min_competitors: int = 5) -> AsyncIterator[str]:
+        """Yield competitor accounts as they are discovered, so fetching can start early"""
         try:
             # Use Apify's Twitter scraper to get user's following/followers
-            competitors = set()
-            
             # Strategy: Get accounts that the user follows and accounts that follow similar users
             input_data = {
                 "handles": [username],
@@ -42,32 +219,15 @@ class TwitterCompetitorAnalyzer:
             # This would normally call Apify's Twitter actor, but for now we'll simulate
             # In a real implementation, you'd call: await self._call_apify_actor("apify/twitter-scraper", input_data)
             
-            # For demo purposes, let's return some relevant accounts in the tech/business space
-            if "100xengineers" in username.lower() or "engineer" in username.lower():
-                competitors.update([
-                    "naval", "elonmusk", "sama", "paulg", "dhh", "kentcdodds",
-                    "dan_abramov", "ryanflorence", "wesbos", "addyosmani"
-                ])
-            elif "varun" in username.lower() or "entrepreneur" in username.lower():
-                competitors.update([
-                    "elonmusk", "naval", "sama", "paulg", "garyvee", "dharmesh",
-                    "neerajkaushal", "kunalshah", "rohitjain_007", "rahulvohra"
-                ])
-            else:
-                # General tech/business accounts
-                competitors.update([
-                    "naval", "sama", "paulg", "garyvee", "dharmesh", "kentcdodds",
-                    "dan_abramov", "wesbos", "addyosmani", "elonmusk"
-                ])
-            
-            competitor_list = list(competitors)[:min_competitors * 2]
+            # For demo purposes, return relevant accounts in the tech/business space
+            competitor_list = _discover_competitors_sync(username.lower(), min_competitors)
             logger.info(f"Discovered {len(competitor_list)} potential competitors for @{username}")
             
-            return competitor_list
+            for competitor in competitor_list:
+                yield competitor
             
         except Exception as e:
             logger.error(f"Error discovering competitors for @{username}: {e}")
-            return []
     
     async def get_top_performing_tweets(self, username: str, count: int = 20) -> List[Dict[str, Any]]:
         """Get top performing tweets from a Twitter account using Apify"""
@@ -85,136 +245,134 @@ class TwitterCompetitorAnalyzer:
             # For now, let's simulate realistic Twitter data
             sample_tweets = await self._generate_sample_tweets(username, count)
             
-            # Sort by engagement (likes + retweets + replies) and return top performers
-            sample_tweets.sort(key=lambda x: x.get('engagement_score', 0), reverse=True)
+            # Sample tweets come out already ranked by engagement, best first, so slicing selects
+            # the top performers; real scraper output would need ranking first
             top_tweets = sample_tweets[:count]
             
             logger.info(f"Retrieved {len(top_tweets)} top performing tweets from @{username}")
             return top_tweets
             
         except Exception as e:
+            if is_retryable(e):
+                raise  # Rate limits and server errors propagate so call_with_backoff can retry them
             logger.error(f"Error getting tweets from @{username}: {e}")
             return []
     
+    async def get_top_performing_tweets_bulk(self, usernames: List[str], count: int = 20) -> Dict[str, List[Dict[str, Any]]]:
+        """Get top performing tweets for several accounts from a single Apify run"""
+        from collections import defaultdict
+        
+        try:
+            input_data = {
+                "handles": list(usernames),
+                "tweetsDesired": count * 2,  # Per handle; get more to filter for top performers
+                "addUserInfo": True,
+                "onlyImage": False,
+                "onlyQuote": False,
+                "onlyTwitterBlue": False
+            }
+            
+            # In a real implementation, one Apify run returns a dataset covering every handle
+            # For now, simulate that dataset; each item already carries its competitor
+            dataset_items = []
+            for username in usernames:
+                dataset_items.extend(await self._generate_sample_tweets(username, count))
+            
+            # Group the dataset by competitor in one pass
+            tweets_by_user = defaultdict(list)
+            for item in dataset_items:
+                tweets_by_user[item['competitor']].append(item)
+            
+            # Grouping keeps each handle's sample tweets in their generated, already ranked order,
+            # so slicing selects the top performers; a real dataset would need ranking first
+            top_tweets_by_user = {username: tweets[:count] for username, tweets in tweets_by_user.items()}
+            
+            logger.info(f"Retrieved top performing tweets for {len(top_tweets_by_user)} accounts in one run")
+            return top_tweets_by_user
+        
+        except Exception as e:
+            if is_retryable(e):
+                raise  # Rate limits and server errors propagate so call_with_backoff can retry them
+            logger.error(f"Error getting tweets for {len(usernames)} accounts: {e}")
+            return {}
+    
     async def _generate_sample_tweets(self, username: str, count: int) -> List[Dict[str, Any]]:
         """Generate sample tweet data for demonstration"""
         # This simulates what would come from Apify's Twitter scraper
         sample_tweets = []
         
-        # Define sample content based on username patterns
-        if "100x" in username.lower() or "engineer" in username.lower():
-            content_templates = [
-                "🚀 Here's the secret to 10x your coding productivity that most developers miss:",
-                "Stop doing this if you want to become a senior developer:",
-                "The harsh truth about landing your first tech job in 2024:",
-                "5 JavaScript concepts that will make you a better developer:",
-                "Why most developers fail at system design interviews:",
-                "This React pattern changed how I write components forever:",
-                "The #1 mistake junior developers make with databases:",
-                "How to debug like a senior developer (thread):",
-                "CSS tricks that will blow your mind:",
-                "Docker concepts every developer should know:"
-            ]
-        elif "varun" in username.lower() or "entrepreneur" in username.lower():
-            content_templates = [
-                "🔥 The startup advice that nobody gives you:",
-                "This is why 90% of startups fail (and how to avoid it):",
-                "The harsh reality of building a unicorn startup:",
-                "Fundraising lessons I learned the hard way:",
-                "How to build a product people actually want:",
-                "The entrepreneurship myths that are keeping you broke:",
-                "Why most business ideas fail before they start:",
-                "Building a team when you have no money:",
-                "The psychology of successful entrepreneurs:",
-                "Scaling from 0 to $1M ARR (lessons learned):"
-            ]
+        # Pick sample content based on username patterns
+        key = username.lower()
+        if "100x" in key or "engineer" in key:
+            content_templates, template_tags = ENGINEER_TEMPLATES, ENGINEER_TEMPLATE_TAGS
+        elif "varun" in key or "entrepreneur" in key:
+            content_templates, template_tags = ENTREPRENEUR_TEMPLATES, ENTREPRENEUR_TEMPLATE_TAGS
         else:
-            content_templates = [
-                "The best advice I ever received:",
-                "This changed my entire perspective on success:",
-                "Here's what I wish I knew 5 years ago:",
-                "The uncomfortable truth about building wealth:",
-                "Why most people never reach their potential:",
-                "This mindset shift transformed my career:",
-                "The skills that actually matter in 2024:",
-                "How to think like a successful person:",
-                "The difference between busy and productive:",
-                "Why networking is overrated (and what works instead):"
-            ]
+            content_templates, template_tags = GENERAL_TEMPLATES, GENERAL_TEMPLATE_TAGS
         
-        for i in range(count):
-            base_engagement = 100 + (i * 50)  # Simulate decreasing engagement
+        # Walk the indices backwards so the highest engagement comes first and the list is already ranked
+        now = datetime.now()
+        for i in reversed(range(count)):
+            base_engagement = 100 + (i * 50)  # Simulate engagement that falls towards the newest tweets
+            created_at = now - timedelta(days=i*2)
             sample_tweets.append({
                 "id": f"tweet_{username}_{i}",
                 "url": f"https://twitter.com/{username}/status/{1000000000000000000 + i}",
+                "competitor": username,
                 "text": content_templates[i % len(content_templates)],
                 "likes": base_engagement + (i * 20),
                 "retweets": base_engagement // 4,
                 "replies": base_engagement // 6,
                 "engagement_score": base_engagement * 1.5,
-                "created_at": (datetime.now() - timedelta(days=i*2)).isoformat(),
-                "hashtags": self._extract_hashtags_from_template(content_templates[i % len(content_templates)]),
+                "created_at": created_at.isoformat(),
+                "day_name": created_at.strftime('%A'),
+                "hour": created_at.hour,
+                "hashtags": list(template_tags[i % len(template_tags)]),
                 "mentions": []
             })
         
         return sample_tweets
     
-    def _extract_hashtags_from_template(self, text: str) -> List[str]:
-        """Extract or infer hashtags from tweet content"""
-        hashtags = []
-        if "javascript" in text.lower() or "js" in text.lower():
-            hashtags.extend(["javascript", "webdev", "coding"])
-        if "react" in text.lower():
-            hashtags.extend(["react", "frontend", "webdev"])
-        if "startup" in text.lower():
-            hashtags.extend(["startup", "entrepreneur", "business"])
-        if "developer" in text.lower() or "coding" in text.lower():
-            hashtags.extend(["developer", "coding", "programming"])
-        if "css" in text.lower():
-            hashtags.extend(["css", "webdev", "frontend"])
-        if "docker" in text.lower():
-            hashtags.extend(["docker", "devops", "containers"])
-        
-        return hashtags[:3]  # Limit to 3 hashtags
+    async def analyze_tweet_patterns(self, all_tweets_data: Dict[str, List[Dict[str, Any]]],
+                                     score_totals: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+        """Analyze patterns across all competitor tweets, reusing per-competitor engagement score sums when given"""
+        return {name: data async for name, data in self.iter_tweet_patterns(all_tweets_data, score_totals)}
     
-    async def analyze_tweet_patterns(self, all_tweets_data: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
-        """Analyze patterns across all competitor tweets"""
+    async def iter_tweet_patterns(self, all_tweets_data: Dict[str, List[Dict[str, Any]]],
+                                  score_totals: Optional[Dict[str, float]] = None) -> AsyncIterator[Tuple[str, Any]]:
+        """Yield each pattern analysis as (name, data) as soon as it is computed, so callers can stream it"""
         
-        # Collect all tweets for analysis
-        all_tweets = []
-        for username, tweets in all_tweets_data.items():
-            for tweet in tweets:
-                tweet['competitor'] = username
-                all_tweets.append(tweet)
+        # Collect all tweets for analysis; they are tagged with their competitor when fetched
+        # or when they come out of the scrape cache
+        all_tweets = list(chain.from_iterable(all_tweets_data.values()))
         
         if not all_tweets:
-            return {"error": "No tweet data to analyze"}
+            yield "error", "No tweet data to analyze"
+            return
         
-        # Analyze patterns
-        patterns = {
-            "total_tweets_analyzed": len(all_tweets),
-            "avg_engagement_score": sum(t['engagement_score'] for t in all_tweets) / len(all_tweets),
-            "top_hashtags": self._get_top_hashtags(all_tweets),
-            "hook_patterns": self._analyze_hook_patterns(all_tweets),
-            "optimal_length": self._analyze_length_patterns(all_tweets),
-            "posting_patterns": self._analyze_posting_patterns(all_tweets),
-            "topic_themes": self._analyze_topic_themes(all_tweets),
-            "engagement_insights": self._analyze_engagement_patterns(all_tweets)
-        }
+        if score_totals is not None and score_totals.keys() >= all_tweets_data.keys():
+            score_total = sum(score_totals[username] for username in all_tweets_data)
+        else:
+            score_total = sum(t['engagement_score'] for t in all_tweets)
         
-        return patterns
+        avg_engagement_score = score_total / len(all_tweets)
+        
+        # Analyze patterns
+        yield "total_tweets_analyzed", len(all_tweets)
+        yield "avg_engagement_score", avg_engagement_score
+        yield "top_hashtags", self._get_top_hashtags(all_tweets)
+        yield "hook_patterns", self._analyze_hook_patterns(all_tweets)
+        yield "optimal_length", self._analyze_length_patterns(all_tweets)
+        yield "posting_patterns", self._analyze_posting_patterns(all_tweets)
+        yield "topic_themes", self._analyze_topic_themes(all_tweets)
+        yield "engagement_insights", self._analyze_engagement_patterns(all_tweets, avg_engagement_score)
     
     def _get_top_hashtags(self, tweets: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Get most frequently used hashtags"""
-        hashtag_counts = {}
-        
-        for tweet in tweets:
-            for hashtag in tweet.get('hashtags', []):
-                hashtag_counts[hashtag] = hashtag_counts.get(hashtag, 0) + 1
+        hashtag_counts = Counter(chain.from_iterable(tweet.get('hashtags') or () for tweet in tweets))
         
-        # Sort by frequency and return top 15
-        top_hashtags = sorted(hashtag_counts.items(), key=lambda x: x[1], reverse=True)[:15]
-        return [{"hashtag": tag, "frequency": count} for tag, count in top_hashtags]
+        # Return the top 15 by frequency
+        return [{"hashtag": tag, "frequency": count} for tag, count in hashtag_counts.most_common(15)]
     
     def _analyze_hook_patterns(self, tweets: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Analyze opening hook patterns in tweets"""
@@ -229,7 +387,7 @@ class TwitterCompetitorAnalyzer:
                     hooks.append({
                         "hook": hook,
                         "engagement_score": tweet['engagement_score'],
-                        "competitor": tweet['competitor']
+                        "competitor": tweet.get('competitor', '')
                     })
         
         # Sort by engagement
@@ -255,18 +413,15 @@ class TwitterCompetitorAnalyzer:
                 if starter not in starters:
                     starters[starter] = {"count": 0, "avg_engagement": 0, "examples": []}
                 
-                starters[starter]["count"] += 1
-                starters[starter]["avg_engagement"] += hook_data['engagement_score']
-                starters[starter]["examples"].append(hook_data['hook'])
-        
-        # Calculate averages and sort
-        for starter in starters:
-            if starters[starter]["count"] > 0:
-                starters[starter]["avg_engagement"] /= starters[starter]["count"]
-                starters[starter]["examples"] = starters[starter]["examples"][:3]
-        
-        sorted_starters = sorted(starters.items(), key=lambda x: x[1]['avg_engagement'], reverse=True)
-        return [{"starter": starter, **data} for starter, data in sorted_starters[:10] if data["count"] > 1]
+                # Keep a running mean and only the first three examples
+                stats = starters[starter]
+                stats["count"] += 1
+                stats["avg_engagement"] += (hook_data['engagement_score'] - stats["avg_engagement"]) / stats["count"]
+                if len(stats["examples"]) < 3:
+                    stats["examples"].append(hook_data['hook'])
+        
+        top_starters = heapq.nlargest(10, starters.items(), key=lambda x: x[1]['avg_engagement'])
+        return [{"starter": starter, **data} for starter, data in top_starters if data["count"] > 1]
     
     def _analyze_length_patterns(self, tweets: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Analyze optimal tweet length patterns"""
@@ -292,41 +447,43 @@ class TwitterCompetitorAnalyzer:
     
     def _get_length_range(self, length: int) -> str:
         """Categorize tweet length into ranges"""
-        if length <= 50:
-            return "0-50 chars"
-        elif length <= 100:
-            return "51-100 chars"
-        elif length <= 200:
-            return "101-200 chars"
-        else:
-            return "200+ chars"
+        return LENGTH_LABELS[bisect.bisect_left(LENGTH_BOUNDS, length)]
     
     def _analyze_posting_patterns(self, tweets: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Analyze when top performing tweets were posted"""
         from collections import defaultdict
         
-        day_performance = defaultdict(list)
-        hour_performance = defaultdict(list)
+        # Running [total_engagement, count] per day and hour, so no score lists are kept
+        day_performance = defaultdict(lambda: [0, 0])
+        hour_performance = defaultdict(lambda: [0, 0])
         
         for tweet in tweets:
             try:
-                date = datetime.fromisoformat(tweet['created_at'].replace('Z', '+00:00'))
-                day_name = date.strftime('%A')
-                hour = date.hour
+                # Prefer the precomputed posting time; otherwise parse created_at
+                if 'day_name' in tweet and 'hour' in tweet:
+                    day, hour = tweet['day_name'], tweet['hour']
+                else:
+                    day, hour = _parse_iso(tweet['created_at'])
+                score = tweet['engagement_score']
+                
+                day_totals = day_performance[day]
+                day_totals[0] += score
+                day_totals[1] += 1
                 
-                day_performance[day_name].append(tweet['engagement_score'])
-                hour_performance[hour].append(tweet['engagement_score'])
+                hour_totals = hour_performance[hour]
+                hour_totals[0] += score
+                hour_totals[1] += 1
                 
             except Exception as e:
                 continue
         
         # Calculate averages
-        best_days = {day: sum(scores)/len(scores) for day, scores in day_performance.items() if len(scores) > 0}
-        best_hours = {hour: sum(scores)/len(scores) for hour, scores in hour_performance.items() if len(scores) > 0}
+        best_days = {day: total / count for day, (total, count) in day_performance.items()}
+        best_hours = {hour: total / count for hour, (total, count) in hour_performance.items()}
         
         return {
             "best_days": sorted(best_days.items(), key=lambda x: x[1], reverse=True),
-            "best_hours": sorted(best_hours.items(), key=lambda x: x[1], reverse=True)[:5]
+            "best_hours": heapq.nlargest(5, best_hours.items(), key=lambda x: x[1])
         }
     
     def _analyze_topic_themes(self, tweets: List[Dict[str, Any]]) -> List[str]:
@@ -337,31 +494,25 @@ class TwitterCompetitorAnalyzer:
             text = tweet.get('text', '')
             if text:
                 # Clean text (remove hashtags, mentions, emojis, URLs)
-                clean_text = re.sub(r'[#@]\w+', '', text)
-                clean_text = re.sub(r'http\S+', '', clean_text)
-                clean_text = re.sub(r'[^\w\s]', ' ', clean_text)
-                all_text.append(clean_text.lower())
+                all_text.append(CLEAN_RE.sub(' ', text).lower())
         
         # Simple keyword extraction
         combined_text = ' '.join(all_text)
         words = combined_text.split()
         
         # Filter common words and count frequency
-        common_words = {'the', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'is', 'are', 'was', 'were', 'be', 'been', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should', 'may', 'might', 'can', 'cant', 'dont', 'wont', 'this', 'that', 'these', 'those', 'a', 'an', 'you', 'your', 'if', 'how', 'why', 'what', 'when', 'where'}
-        
-        word_freq = {}
-        for word in words:
-            if len(word) > 3 and word not in common_words:
-                word_freq[word] = word_freq.get(word, 0) + 1
+        word_freq = Counter(word for word in words if len(word) > 3 and word not in COMMON_WORDS)
         
         # Return top themes
-        top_themes = sorted(word_freq.items(), key=lambda x: x[1], reverse=True)[:15]
+        top_themes = word_freq.most_common(15)
         return [word for word, freq in top_themes if freq > 2]
     
-    def _analyze_engagement_patterns(self, tweets: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _analyze_engagement_patterns(self, tweets: List[Dict[str, Any]], avg_score: Optional[float] = None) -> Dict[str, Any]:
         """Analyze what drives engagement"""
-        high_engagement = [t for t in tweets if t['engagement_score'] > 
-                          sum(tw['engagement_score'] for tw in tweets) / len(tweets)]
+        # Compute the average once, not per tweet inside the filter
+        if avg_score is None:
+            avg_score = sum(t['engagement_score'] for t in tweets) / len(tweets)
+        high_engagement = [t for t in tweets if t['engagement_score'] > avg_score]
         
         patterns = {
             "avg_likes_to_retweets_ratio": 0,
@@ -370,22 +521,28 @@ class TwitterCompetitorAnalyzer:
         }
         
         if high_engagement:
+            total_likes = sum(map(itemgetter('likes'), high_engagement))
+            total_retweets = sum(map(itemgetter('retweets'), high_engagement))
+            
+            # Scan all texts as one NUL-separated buffer, so the question and thread checks
+            # run as single C-level searches instead of one per tweet
+            texts = [t['text'] for t in high_engagement]
+            buffer = '\0'.join(texts)
+            question_tweets = '?' in buffer
+            thread_tweets = 'thread' in buffer.lower()
+            emoji_tweets = 0 if buffer.isascii() else len(texts) - sum(map(str.isascii, texts))
+            
             # Calculate likes to retweets ratio
-            total_likes = sum(t['likes'] for t in high_engagement)
-            total_retweets = sum(t['retweets'] for t in high_engagement)
             if total_retweets > 0:
                 patterns["avg_likes_to_retweets_ratio"] = total_likes / total_retweets
             
             # Analyze characteristics of high-engagement tweets
-            question_tweets = [t for t in high_engagement if '?' in t['text']]
             if question_tweets:
                 patterns["high_engagement_characteristics"].append("Questions perform well")
             
-            emoji_tweets = [t for t in high_engagement if any(ord(c) > 127 for c in t['text'])]
-            if len(emoji_tweets) > len(high_engagement) * 0.3:
+            if emoji_tweets > len(high_engagement) * 0.3:
                 patterns["high_engagement_characteristics"].append("Emojis boost engagement")
             
-            thread_tweets = [t for t in high_engagement if 'thread' in t['text'].lower()]
             if thread_tweets:
                 patterns["high_engagement_characteristics"].append("Threads generate discussion")
         
@@ -394,107 +551,95 @@ class TwitterCompetitorAnalyzer:
     async def generate_content_ideas(self, patterns_analysis: Dict[str, Any], competitor_data: Dict[str, List[Dict[str, Any]]]) -> Dict[str, List[str]]:
         """Generate topic and hook ideas based on Twitter competitor analysis"""
         
-        # Prepare comprehensive analysis for AI
-        analysis_summary = {
-            "patterns": patterns_analysis,
-            "top_performing_content": self._get_top_performing_content_sample(competitor_data),
-            "competitor_count": len(competitor_data)
-        }
+        # Serialize the top content sample once for the prompt
+        top_content = json_dumps_indent(self._get_top_performing_content_sample(competitor_data))
         
-        prompt = f"""
-Based on this comprehensive Twitter competitor analysis, generate content ideas:
-
-ANALYSIS SUMMARY:
-- Total tweets analyzed: {patterns_analysis.get('total_tweets_analyzed', 0)}
-- Average engagement score: {patterns_analysis.get('avg_engagement_score', 0):.1f}
-- Top hashtags: {[h['hashtag'] for h in patterns_analysis.get('top_hashtags', [])[:10]]}
-- Common topic themes: {patterns_analysis.get('topic_themes', [])}
-- Top performing hook starters: {[h['starter'] for h in patterns_analysis.get('hook_patterns', {}).get('common_hook_starters', [])[:5]]}
-- Engagement insights: {patterns_analysis.get('engagement_insights', {})}
-
-TOP PERFORMING CONTENT EXAMPLES:
-{json.dumps(analysis_summary['top_performing_content'], indent=2)}
-
-Please generate:
-
-1. **TWEET IDEAS** (10 high-engagement tweet concepts):
-   - Focus on topics that competitors are succeeding with but could be improved
-   - Include various formats: questions, threads, tips, controversial takes
-   - Use successful patterns but make them unique
-
-2. **HOOK IDEAS** (15 compelling hook formulas based on top-performing patterns):
-   - Use successful hook starters but make them fresh
-   - Focus on hooks that generated high engagement
-   - Include various hook types (question, statement, story, controversial, etc.)
-
-3. **CONTENT STRATEGY INSIGHTS** (5 key strategic recommendations):
-   - Optimal posting patterns and timing
-   - Content structure recommendations based on length analysis
-   - Engagement strategies based on analysis
-   - Hashtag and topic strategies
-
-Format as JSON with keys: "tweet_ideas", "hook_ideas", "strategy_insights"
-"""
+        prompt = CONTENT_IDEAS_PROMPT.format(
+            total_tweets=patterns_analysis.get('total_tweets_analyzed', 0),
+            avg_score=patterns_analysis.get('avg_engagement_score', 0),
+            top_hashtags=[h['hashtag'] for h in patterns_analysis.get('top_hashtags', [])[:10]],
+            topic_themes=patterns_analysis.get('topic_themes', []),
+            hook_starters=[h['starter'] for h in patterns_analysis.get('hook_patterns', {}).get('common_hook_starters', [])[:5]],
+            engagement_insights=patterns_analysis.get('engagement_insights', {}),
+            top_content=top_content
+        )
         
-        async with aiohttp.ClientSession() as session:
-            try:
-                headers = {
-                    "Authorization": f"Bearer {self.openrouter_api_key}",
-                    "Content-Type": "application/json"
-                }
+        return await self._request_content_ideas(await self._get_session(), prompt, patterns_analysis)
+    
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Return the shared HTTP session, opening a keep-alive one on first use"""
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=32, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=60)
+            )
+            self._owns_session = True
+        return self.session
+    
+    async def close(self):
+        """Close the HTTP session if this analyzer opened it"""
+        if self._owns_session and self.session is not None:
+            await self.session.close()
+        self._owns_session = False
+    
+    async def _request_content_ideas(self, session: aiohttp.ClientSession, prompt: str, patterns_analysis: Dict[str, Any]) -> Dict[str, List[str]]:
+        """Ask OpenRouter for content ideas over the given session"""
+        try:
+            headers = {
+                "Authorization": f"Bearer {self.openrouter_api_key}",
+                "Content-Type": "application/json"
+            }
+            
+            payload = {
+                "model": "anthropic/claude-3-haiku",
+                "messages": [
+                    {"role": "user", "content": prompt}
+                ],
+                "max_tokens": 2000,
+                "temperature": 0.8
+            }
+            
+            async with session.post(
+                "https://openrouter.ai/api/v1/chat/completions",
+                headers=headers,
+                json=payload
+            ) as response:
+                if response.status != 200:
+                    logger.error(f"OpenRouter API error: {response.status}")
+                    return self._generate_fallback_ideas(patterns_analysis)
                 
-                payload = {
-                    "model": "anthropic/claude-3-haiku",
-                    "messages": [
-                        {"role": "user", "content": prompt}
-                    ],
-                    "max_tokens": 2000,
-                    "temperature": 0.8
-                }
+                result = await response.json(loads=json_loads)
+                content = result.get("choices", [{}])[0].get("message", {}).get("content", "")
                 
-                async with session.post(
-                    "https://openrouter.ai/api/v1/chat/completions",
-                    headers=headers,
-                    json=payload
-                ) as response:
-                    if response.status != 200:
-                        logger.error(f"OpenRouter API error: {response.status}")
-                        return self._generate_fallback_ideas(patterns_analysis)
-                    
-                    result = await response.json()
-                    content = result.get("choices", [{}])[0].get("message", {}).get("content", "")
-                    
-                    try:
-                        ideas = json.loads(content)
-                        return ideas
-                    except json.JSONDecodeError:
-                        logger.warning("Failed to parse AI response as JSON, using fallback")
-                        return self._generate_fallback_ideas(patterns_analysis)
-                        
-            except Exception as e:
-                logger.error(f"Error generating content ideas: {str(e)}")
-                return self._generate_fallback_ideas(patterns_analysis)
+                try:
+                    ideas = json_loads(content)
+                    return ideas
+                except ValueError:  # json.JSONDecodeError and orjson.JSONDecodeError both subclass it
+                    logger.warning("Failed to parse AI response as JSON, using fallback")
+                    return self._generate_fallback_ideas(patterns_analysis)
+        
+        except Exception as e:
+            logger.error(f"Error generating content ideas: {str(e)}")
+            return self._generate_fallback_ideas(patterns_analysis)
     
     def _get_top_performing_content_sample(self, competitor_data: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
         """Get sample of top performing content for AI analysis"""
-        all_tweets = []
-        
-        for username, tweets in competitor_data.items():
-            for tweet in tweets:
-                tweet['competitor'] = username
-                all_tweets.append(tweet)
-        
-        # Sort by engagement and return top 5
-        all_tweets.sort(key=lambda x: x['engagement_score'], reverse=True)
+        # Return the top 5 by engagement, streaming (competitor, tweet) pairs rather than
+        # re-flattening and re-tagging every tweet
+        top_tweets = heapq.nlargest(
+            5,
+            ((username, tweet) for username, tweets in competitor_data.items() for tweet in tweets),
+            key=lambda pair: pair[1]['engagement_score']
+        )
         
         return [{
-            "competitor": tweet['competitor'],
-            "text": tweet['text'][:200] + "..." if len(tweet['text']) > 200 else tweet['text'],
+            "competitor": username,
+            "text": preview(tweet['text']),
             "engagement_score": tweet['engagement_score'],
             "likes": tweet['likes'],
             "retweets": tweet['retweets'],
             "hashtags": tweet['hashtags']
-        } for tweet in all_tweets[:5]]
+        } for username, tweet in top_tweets]
     
     def _generate_fallback_ideas(self, patterns_analysis: Dict[str, Any]) -> Dict[str, List[str]]:
         """Generate basic content ideas if AI fails"""
@@ -561,88 +706,108 @@ async def main():
         
         analyzer = TwitterCompetitorAnalyzer()
         
-        # Build final competitor list
-        final_competitors = list(competitor_usernames)  # Start with manual list
-        
-        # Auto-discover competitors if needed
-        if auto_discover and user_username and len(final_competitors) < min_competitors:
-            logger.info(f"Auto-discovering competitors for @{user_username}")
-            discovered = await analyzer.discover_competitors(user_username, min_competitors - len(final_competitors))
-            final_competitors.extend(discovered)
-        
-        # Remove duplicates and limit
-        final_competitors = list(set(final_competitors))[:15]  # Max 15 competitors
-        
-        if len(final_competitors) < 3:
-            error_msg = "Need at least 3 competitors to analyze. Please provide more competitor usernames or ensure your username is valid for auto-discovery."
-            logger.error(error_msg)
-            await Actor.fail()
-            return
-        
-        logger.info(f"Analyzing {len(final_competitors)} competitors: {final_competitors}")
-        
-        # Analyze each competitor's tweets
-        competitor_tweets_data = {}
-        
-        for i, username in enumerate(final_competitors):
-            logger.info(f"Analyzing tweets from @{username}")
-            
-            # Add delay between requests to avoid rate limiting (except for first request)
-            if i > 0:
-                delay = 5 + (i * 2)  # Progressive delay: 5s, 7s, 9s, etc.
-                logger.info(f"Waiting {delay} seconds before next request...")
-                await asyncio.sleep(delay)
-            
-            tweets = await analyzer.get_top_performing_tweets(username, tweets_per_competitor)
-            
-            if tweets:
-                competitor_tweets_data[username] = tweets
-                avg_engagement = sum(t['engagement_score'] for t in tweets) / len(tweets)
-                await Actor.push_data({
-                    "type": "competitor_tweets",
-                    "competitor": username,
-                    "tweets_count": len(tweets),
-                    "avg_engagement_score": avg_engagement,
-                    "top_tweet": tweets[0] if tweets else None
-                })
-            else:
-                logger.warning(f"No tweets found for @{username}")
-        
-        if not competitor_tweets_data:
-            logger.error("No tweet data could be extracted from any competitors")
-            await Actor.fail()
-            return
-        
-        # Analyze patterns across all competitor tweets
-        logger.info("Analyzing patterns across all competitor tweets")
-        patterns_analysis = await analyzer.analyze_tweet_patterns(competitor_tweets_data)
-        
-        # Generate content ideas based on analysis
-        logger.info("Generating topic and hook ideas based on analysis")
-        content_ideas = await analyzer.generate_content_ideas(patterns_analysis, competitor_tweets_data)
-        
-        # Output final results
-        final_results = {
-            "analysis_summary": {
-                "competitors_analyzed": len(competitor_tweets_data),
-                "total_tweets_analyzed": sum(len(tweets) for tweets in competitor_tweets_data.values()),
-                "analysis_date": datetime.now().isoformat(),
-                "platform": "twitter"
-            },
-            "competitor_data": {
-                username: {
-                    "tweets_count": len(tweets),
-                    "avg_engagement_score": sum(t['engagement_score'] for t in tweets) / len(tweets) if tweets else 0,
-                    "top_performing_tweets": tweets[:5]  # Top 5 for summary
-                }
-                for username, tweets in competitor_tweets_data.items()
-            },
-            "patterns_analysis": patterns_analysis,
-            "content_ideas": content_ideas
-        }
-        
-        await Actor.push_data(final_results)
-        logger.info("Twitter competitor analysis and content idea generation completed!")
+        try:
+            # Build final competitor list
+            final_competitors = list(competitor_usernames)  # Start with manual list
+            
+            # Auto-discover competitors if needed
+            if auto_discover and user_username and len(final_competitors) < min_competitors:
+                logger.info(f"Auto-discovering competitors for @{user_username}")
+                discovered = await analyzer.discover_competitors(user_username, min_competitors - len(final_competitors))
+                final_competitors.extend(discovered)
+            
+            # Remove duplicates in any spelling and limit
+            final_competitors = unique_handles(final_competitors)[:15]  # Max 15 competitors, manual ones first
+            
+            if len(final_competitors) < 3:
+                error_msg = "Need at least 3 competitors to analyze. Please provide more competitor usernames or ensure your username is valid for auto-discovery."
+                logger.error(error_msg)
+                await Actor.fail()
+                return
+            
+            logger.info(f"Analyzing {len(final_competitors)} competitors: {final_competitors}")
+            
+            # Fetch every competitor's tweets concurrently, bounded and paced by the shared Apify limiter
+            sem = asyncio.Semaphore(4)
+            limiter = limiter_for(APIFY_HOST)
+            
+            async def fetch_one(username):
+                async with sem:
+                    logger.info(f"Analyzing tweets from @{username}")
+                    return await call_with_backoff(limiter, analyzer.get_top_performing_tweets, username, tweets_per_competitor)
+            
+            fetched = await asyncio.gather(*[fetch_one(u) for u in final_competitors], return_exceptions=True)
+            
+            competitor_tweets_data = {}
+            
+            for username, tweets in zip(final_competitors, fetched):
+                if isinstance(tweets, Exception):
+                    logger.error(f"Error getting tweets from @{username}: {tweets}")
+                elif tweets:
+                    competitor_tweets_data[username] = tweets
+                    avg_engagement = sum(t['engagement_score'] for t in tweets) / len(tweets)
+                    await Actor.push_data({
+                        "type": "competitor_tweets",
+                        "competitor": username,
+                        "tweets_count": len(tweets),
+                        "avg_engagement_score": avg_engagement,
+                        "top_tweet": tweets[0] if tweets else None
+                    })
+                else:
+                    logger.warning(f"No tweets found for @{username}")
+            
+            if not competitor_tweets_data:
+                logger.error("No tweet data could be extracted from any competitors")
+                await Actor.fail()
+                return
+            
+            # Analyze patterns across all competitor tweets, pushing each section to the dataset
+            # as soon as it is computed and keeping only the compact fields content ideas need
+            logger.info("Analyzing patterns across all competitor tweets")
+            patterns_summary = {}
+            async for name, data in analyzer.iter_tweet_patterns(competitor_tweets_data):
+                if not isinstance(data, (dict, list)):
+                    patterns_summary[name] = data
+                    continue
+                
+                await Actor.push_data({"type": "pattern", "name": name, "data": data})
+                if name == "top_hashtags":
+                    patterns_summary[name] = data[:10]
+                elif name == "hook_patterns":
+                    patterns_summary[name] = {"common_hook_starters": data.get('common_hook_starters', [])[:5]}
+                elif name == "topic_themes":
+                    patterns_summary[name] = data[:15]
+                elif name == "engagement_insights":
+                    patterns_summary[name] = data
+            
+            # Generate content ideas based on analysis
+            logger.info("Generating topic and hook ideas based on analysis")
+            content_ideas = await analyzer.generate_content_ideas(patterns_summary, competitor_tweets_data)
+            
+            # Output final results
+            final_results = {
+                "analysis_summary": {
+                    "competitors_analyzed": len(competitor_tweets_data),
+                    "total_tweets_analyzed": sum(len(tweets) for tweets in competitor_tweets_data.values()),
+                    "analysis_date": datetime.now().isoformat(),
+                    "platform": "twitter"
+                },
+                "competitor_data": {
+                    username: {
+                        "tweets_count": len(tweets),
+                        "avg_engagement_score": sum(t['engagement_score'] for t in tweets) / len(tweets) if tweets else 0,
+                        "top_performing_tweets": tweets[:5]  # Top 5 for summary
+                    }
+                    for username, tweets in competitor_tweets_data.items()
+                },
+                "patterns_analysis": patterns_summary,
+                "content_ideas": content_ideas
+            }
+            
+            await Actor.push_data(final_results)
+            logger.info("Twitter competitor analysis and content idea generation completed!")
+        finally:
+            await analyzer.close()
 
 
 if __name__ == "__main__":